@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
 
 
@@ -16,6 +17,8 @@ class Company(models.Model):
     document_count = models.IntegerField(default=0)
     url_count = models.IntegerField(default=0)
     last_processed_at = models.DateTimeField(blank=True, null=True)
+    # Bumped whenever the Qdrant collection changes; invalidates cached answers
+    knowledge_version = models.IntegerField(default=0)
 
     class Meta:
         verbose_name_plural = "Companies"
@@ -32,4 +35,9 @@ class Company(models.Model):
         if not self.qdrant_collection_name:
             self.qdrant_collection_name = f"company_{self.slug.replace('-', '_')}"
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+    def bump_knowledge_version(self):
+        """Atomically increment knowledge_version after the collection changed"""
+        Company.objects.filter(pk=self.pk).update(knowledge_version=F('knowledge_version') + 1)
+        self.refresh_from_db(fields=['knowledge_version'])
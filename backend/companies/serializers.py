@@ -18,7 +18,8 @@ class CompanySerializer(serializers.ModelSerializer):
 
 
 class CompanyStatsSerializer(serializers.ModelSerializer):
-    query_count = serializers.SerializerMethodField()
+    # Annotated by CompanyViewSet.stats
+    query_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Company
@@ -26,6 +27,3 @@ class CompanyStatsSerializer(serializers.ModelSerializer):
             'id', 'name', 'document_count', 'url_count', 'query_count',
             'last_processed_at'
         ]
-
-    def get_query_count(self, obj):
-        return obj.queries.count()
\ No newline at end of file
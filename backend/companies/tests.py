@@ -0,0 +1,14 @@
+from django.test import TestCase
+
+from core.testing import QueryBudgetMixin
+
+
+class CompanyQueryCountTests(QueryBudgetMixin, TestCase):
+    def test_list(self):
+        self.assertQueryBudget(2, lambda data: '/api/v1/companies/')
+
+    def test_detail(self):
+        self.assertQueryBudget(1, lambda data: f'/api/v1/companies/{data.company.id}/')
+
+    def test_stats(self):
+        self.assertQueryBudget(1, lambda data: '/api/v1/companies/stats/')
@@ -2,11 +2,13 @@ import logging
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Count
 from django.utils import timezone
 
 from .models import Company
 from .serializers import CompanySerializer, CompanyStatsSerializer
-from core.rag_processor import DjangoFinancialRAGProcessor
+from core.registry import get_rag_processor
+from documents.signals import skip_point_deletion
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +22,7 @@ class CompanyViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get company statistics"""
-        companies = self.get_queryset()
+        companies = self.get_queryset().annotate(query_count=Count('queries'))
         serializer = CompanyStatsSerializer(companies, many=True)
         return Response(serializer.data)
 
@@ -30,7 +32,7 @@ class CompanyViewSet(viewsets.ModelViewSet):
         company = self.get_object()
         
         try:
-            processor = DjangoFinancialRAGProcessor()
+            processor = get_rag_processor()
             success = processor.delete_collection(company.name)
             
             if success:
@@ -38,11 +40,13 @@ class CompanyViewSet(viewsets.ModelViewSet):
                 company.document_count = 0
                 company.url_count = 0
                 company.last_processed_at = timezone.now()
-                company.save()
+                company.save(update_fields=['document_count', 'url_count', 'last_processed_at', 'updated_at'])
+                company.bump_knowledge_version()
                 
-                # Also clear related database records
-                company.documents.all().delete()
-                company.scraped_urls.all().delete()
+                # Also clear related database records; their points went with the collection
+                with skip_point_deletion():
+                    company.documents.all().delete()
+                    company.scraped_urls.all().delete()
                 
                 logger.info(f"Cleared knowledge base for company: {company.name}")
                 return Response({
@@ -68,7 +72,7 @@ class CompanyViewSet(viewsets.ModelViewSet):
         company = self.get_object()
         
         try:
-            processor = DjangoFinancialRAGProcessor()
+            processor = get_rag_processor()
             collection_info = processor.get_collection_info(company.name)
             
             if collection_info:
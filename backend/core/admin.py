@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import EmbeddingCacheEntry
+
+
+@admin.register(EmbeddingCacheEntry)
+class EmbeddingCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['text_hash', 'model_name', 'dimensions', 'hit_count', 'last_used_at', 'created_at']
+    list_filter = ['model_name']
+    search_fields = ['text_hash']
+    exclude = ['vector']
+    readonly_fields = ['model_name', 'text_hash', 'dimensions', 'hit_count', 'last_used_at', 'created_at']
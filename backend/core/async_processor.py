@@ -0,0 +1,85 @@
+"""
+Async question answering for the ASGI query path
+
+Reuses the sync processor's retriever settings, context packer and prompt, but
+talks to Qdrant and Ollama through async clients so a waiting question doesn't
+hold a thread. CPU-bound steps (query embedding, token counting) run in worker
+threads.
+"""
+import asyncio
+import logging
+
+from django.conf import settings
+
+from .vector_store import has_sparse_vectors
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRAGProcessor:
+    def __init__(self, processor, registry):
+        self.processor = processor
+        self.registry = registry
+
+    async def _has_sparse_vectors(self, client, collection_name):
+        known_collections = self.processor._known_collections
+        if collection_name not in known_collections:
+            collection_info = await client.get_collection(collection_name)
+            known_collections[collection_name] = has_sparse_vectors(collection_info)
+        return known_collections[collection_name]
+
+    async def answer_question(self, question, collection_name, filters=None):
+        """Async answer_question; returns the same result dict"""
+        processor = self.processor
+        client = self.registry.get_async_qdrant_client()
+
+        try:
+            hybrid = (
+                settings.RAG_SETTINGS.get('HYBRID_SEARCH_ENABLED', True)
+                and await self._has_sparse_vectors(client, collection_name)
+            )
+            try:
+                relevant_docs = await processor.retriever.aretrieve(
+                    client,
+                    question,
+                    collection_name,
+                    qdrant_filter=processor.search_filter(filters),
+                    hybrid=hybrid
+                )
+            except Exception:
+                # The collection may have been deleted or recreated by another process
+                processor._known_collections.pop(collection_name, None)
+                raise
+            relevant_docs, prompt, prompt_tokens, company_name = await asyncio.to_thread(
+                processor._pack_prompt, question, collection_name, relevant_docs
+            )
+
+            if not relevant_docs:
+                return processor._no_context_result()
+
+            generation_failed = False
+            async with processor.llm_limiter.aslot():
+                try:
+                    answer = (await self.registry.get_async_llm().generate(prompt)).strip()
+                except Exception as llm_error:
+                    logger.error(f"LLM generation error: {llm_error}")
+                    answer = f"Error generating response: {str(llm_error)}"
+                    generation_failed = True
+
+            return {
+                "answer": answer,
+                "sources": processor._format_sources(relevant_docs),
+                "context_found": True,
+                "company": company_name,
+                "prompt_tokens": prompt_tokens,
+                "llm_error": generation_failed
+            }
+
+        except Exception as e:
+            logger.error(f"Error in async answer_question: {e}")
+            raise
+
+    async def analyze_company(self, question, company_name, filters=None):
+        """Convenience wrapper"""
+        collection_name = f"company_{company_name.lower().replace(' ', '_').replace('.', '')}"
+        return await self.answer_question(question, collection_name, filters=filters)
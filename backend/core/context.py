@@ -0,0 +1,154 @@
+"""
+Context assembly for the LLM prompt: MMR-style selection of retrieved chunks
+packed into a token budget, with oversized tables trimmed to relevant rows
+"""
+import logging
+
+from langchain_core.documents import Document
+
+from .retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Chunks are joined with a blank line in the prompt
+SEPARATOR = "\n\n"
+
+
+class TokenCounter:
+    """
+    Counts tokens with the LLM's HuggingFace tokenizer, falling back to a
+    characters-per-token estimate if it couldn't be loaded
+    """
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer
+
+    @property
+    def exact(self):
+        return self.tokenizer is not None
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextPacker:
+    """
+    Orders retrieved chunks by maximal marginal relevance (retrieval rank
+    against lexical overlap with chunks already picked), drops near-duplicates
+    and adds chunks until ``token_budget`` is reached. Tables over
+    ``max_table_tokens`` keep their header and the rows sharing most terms with
+    the question.
+    """
+
+    def __init__(self, token_counter, token_budget=1500, mmr_lambda=0.7,
+                 duplicate_threshold=0.85, max_table_tokens=400):
+        self.token_counter = token_counter
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.max_table_tokens = max_table_tokens
+
+    def pack(self, question, documents):
+        """Returns (documents, context text, context tokens)"""
+        question_terms = set(tokenize(question))
+        separator_tokens = self.token_counter.count(SEPARATOR)
+
+        packed, parts = [], []
+        used_tokens = 0
+        for doc in self._select(documents):
+            remaining = self.token_budget - used_tokens - (separator_tokens if parts else 0)
+            if remaining <= 0:
+                break
+
+            content = doc.page_content
+            tokens = self.token_counter.count(content)
+            if doc.metadata.get('type') == 'financial_table':
+                limit = min(self.max_table_tokens, remaining)
+                if tokens > limit:
+                    content = self._trim_table(content, question_terms, limit)
+                    tokens = self.token_counter.count(content)
+            if not content or tokens > remaining:
+                continue
+
+            if parts:
+                used_tokens += separator_tokens
+            parts.append(content)
+            used_tokens += tokens
+            packed.append(doc if content == doc.page_content else Document(
+                page_content=content, metadata=doc.metadata
+            ))
+
+        logger.info(
+            f"Packed {len(packed)} of {len(documents)} chunks into {used_tokens} tokens "
+            f"(budget {self.token_budget}{'' if self.token_counter.exact else ', estimated'})"
+        )
+        return packed, SEPARATOR.join(parts), used_tokens
+
+    def _select(self, documents):
+        """MMR order over the retrieval ranking, skipping near-duplicates"""
+        candidates = [
+            (1.0 - rank / len(documents), set(tokenize(doc.page_content)), doc)
+            for rank, doc in enumerate(documents)
+        ]
+        selected_terms = []
+        while candidates:
+            best_index, best_score = None, None
+            for index, (relevance, terms, _) in enumerate(candidates):
+                redundancy = max((jaccard(terms, picked) for picked in selected_terms), default=0.0)
+                if redundancy >= self.duplicate_threshold:
+                    continue
+                score = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+                if best_score is None or score > best_score:
+                    best_index, best_score = index, score
+            if best_index is None:
+                break
+            _, terms, doc = candidates.pop(best_index)
+            selected_terms.append(terms)
+            yield doc
+
+    def _trim_table(self, content, question_terms, token_limit):
+        """
+        Keep the title and header lines plus the rows sharing most terms with
+        the question, in their original order
+        """
+        lines = content.split("\n")
+        # "Financial Table (Page N):" followed by the column header line
+        head, rows = lines[:2], lines[2:]
+        # Room for the "rows omitted" note
+        token_limit -= self.token_counter.count(f"... ({len(rows)} more rows omitted)") + 1
+        kept_tokens = self.token_counter.count("\n".join(head))
+        if kept_tokens > token_limit:
+            return ""
+
+        ranked = sorted(
+            range(len(rows)),
+            key=lambda i: len(question_terms & set(tokenize(rows[i]))),
+            reverse=True
+        )
+        keep = set()
+        for index in ranked:
+            row_tokens = self.token_counter.count(rows[index]) + 1
+            if kept_tokens + row_tokens > token_limit:
+                continue
+            keep.add(index)
+            kept_tokens += row_tokens
+
+        if not keep:
+            return ""
+        trimmed = [row for index, row in enumerate(rows) if index in keep]
+        if len(keep) < len(rows):
+            trimmed.append(f"... ({len(rows) - len(keep)} more rows omitted)")
+        return "\n".join(head + trimmed)
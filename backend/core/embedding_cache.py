@@ -0,0 +1,160 @@
+"""
+Content-addressed embedding cache so identical chunks are only embedded once
+"""
+import hashlib
+import logging
+import threading
+from array import array
+
+from django.db.models import F
+from django.utils import timezone
+from langchain_core.embeddings import Embeddings
+
+from .models import EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists well below backend parameter limits
+LOOKUP_BATCH_SIZE = 500
+
+
+def normalize_text(text):
+    """Collapse whitespace so layout-only differences hit the same entry"""
+    return ' '.join(text.split())
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def encode_vector(vector):
+    return array('f', vector).tobytes()
+
+
+def decode_vector(data):
+    vector = array('f')
+    vector.frombytes(bytes(data))
+    return vector.tolist()
+
+
+class CacheStats:
+    """Process-wide hit/miss counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def record(self, hits=0, misses=0, evicted=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evicted += evicted
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+cache_stats = CacheStats()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model; embed_documents only sends cache misses to the
+    wrapped model. Queries are passed straight through.
+    """
+
+    def __init__(self, embeddings, model_name, max_entries=None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts):
+        hashes = [text_hash(text) for text in texts]
+        cached = self._lookup(set(hashes))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for text, digest in zip(texts, hashes):
+            if digest not in cached and digest not in missing:
+                missing[digest] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_entries = {}
+            for digest, vector in zip(missing.keys(), vectors):
+                cached[digest] = vector
+                new_entries[digest] = vector
+            self._store(new_entries)
+
+        cache_stats.record(hits=len(texts) - len(missing), misses=len(missing))
+        logger.info(
+            f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses "
+            f"for {len(texts)} chunks ({self.model_name})"
+        )
+        return [cached[digest] for digest in hashes]
+
+    def _lookup(self, hashes):
+        found = {}
+        hashes = list(hashes)
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+            entries = EmbeddingCacheEntry.objects.filter(
+                model_name=self.model_name, text_hash__in=batch
+            ).values_list('text_hash', 'vector')
+            for digest, vector in entries:
+                found[digest] = decode_vector(vector)
+
+        if found:
+            EmbeddingCacheEntry.objects.filter(
+                model_name=self.model_name, text_hash__in=list(found)
+            ).update(hit_count=F('hit_count') + 1, last_used_at=timezone.now())
+        return found
+
+    def _store(self, vectors):
+        EmbeddingCacheEntry.objects.bulk_create(
+            [
+                EmbeddingCacheEntry(
+                    model_name=self.model_name,
+                    text_hash=digest,
+                    dimensions=len(vector),
+                    vector=encode_vector(vector),
+                )
+                for digest, vector in vectors.items()
+            ],
+            batch_size=LOOKUP_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    def evict(self):
+        """
+        Drop entries from other embedding models, then trim least recently
+        used entries down to max_entries.
+        """
+        evicted, _ = EmbeddingCacheEntry.objects.exclude(model_name=self.model_name).delete()
+
+        if self.max_entries:
+            cutoff = (
+                EmbeddingCacheEntry.objects.order_by('-last_used_at')
+                .values_list('last_used_at', flat=True)[self.max_entries:self.max_entries + 1]
+            )
+            cutoff = list(cutoff)
+            if cutoff:
+                deleted, _ = EmbeddingCacheEntry.objects.filter(last_used_at__lte=cutoff[0]).delete()
+                evicted += deleted
+
+        if evicted:
+            cache_stats.record(evicted=evicted)
+            logger.info(f"Evicted {evicted} embedding cache entries")
+        return evicted
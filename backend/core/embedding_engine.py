@@ -0,0 +1,155 @@
+"""
+Batched chunk embedding with length-sorted batches and an optional
+multi-process encode pool
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingEngine(Embeddings):
+    """
+    Embeds documents in batches of similar length to reduce padding waste.
+
+    ``processes`` > 1 (or -1 for one per core) encodes large inputs with a
+    sentence-transformers multi-process pool. Daemonic processes (prefork
+    Celery children) can't have children of their own, so there the pool is
+    never started and everything is encoded in-process, as it is if starting
+    the pool fails.
+    """
+
+    def __init__(self, embeddings, batch_size=32, processes=0, sort_by_length=True):
+        self.embeddings = embeddings
+        self.batch_size = max(int(batch_size), 1)
+        self.processes = (os.cpu_count() or 1) if processes == -1 else int(processes or 0)
+        self.sort_by_length = sort_by_length
+
+        self._pool = None
+        self._pool_failed = False
+        self._lock = threading.Lock()
+        self.last_stats = None
+
+    @property
+    def _client(self):
+        # langchain_huggingface keeps the SentenceTransformer on `_client`, older wrappers on `client`
+        return getattr(self.embeddings, '_client', None) or getattr(self.embeddings, 'client', None)
+
+    @property
+    def _normalize(self):
+        encode_kwargs = getattr(self.embeddings, 'encode_kwargs', None) or {}
+        return encode_kwargs.get('normalize_embeddings', False)
+
+    @property
+    def pool_enabled(self):
+        """Whether large inputs go to the encode pool in this process"""
+        if self.processes <= 1 or self._pool_failed:
+            return False
+        if multiprocessing.current_process().daemon:
+            self._pool_failed = True
+            logger.info(
+                f"EMBEDDING_PROCESSES={self.processes} ignored in daemonic process "
+                f"{multiprocessing.current_process().name}, encoding in-process"
+            )
+            return False
+        return True
+
+    @property
+    def pool_batch_size(self):
+        """Smallest input encoded on the pool, or 0 if the pool is disabled or can't start here"""
+        return self.batch_size * self.processes if self.pool_enabled else 0
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts):
+        texts = [text.replace("\n", " ") for text in texts]
+        if not texts:
+            return []
+
+        start_time = time.perf_counter()
+
+        order = list(range(len(texts)))
+        if self.sort_by_length:
+            order.sort(key=lambda i: len(texts[i]))
+        sorted_texts = [texts[i] for i in order]
+
+        pool_batch_size = self.pool_batch_size
+        pool = self._get_pool() if pool_batch_size and len(texts) >= pool_batch_size else None
+        if pool is not None:
+            sorted_vectors = self._client.encode_multi_process(
+                sorted_texts, pool, batch_size=self.batch_size
+            )
+            if self._normalize:
+                sorted_vectors = self._normalize_rows(sorted_vectors)
+            sorted_vectors = [vector.tolist() for vector in sorted_vectors]
+        else:
+            sorted_vectors = []
+            for start in range(0, len(sorted_texts), self.batch_size):
+                sorted_vectors.extend(self._encode_batch(sorted_texts[start:start + self.batch_size]))
+
+        vectors = [None] * len(texts)
+        for position, index in enumerate(order):
+            vectors[index] = sorted_vectors[position]
+
+        elapsed = time.perf_counter() - start_time
+        self.last_stats = {
+            'chunks': len(texts),
+            'seconds': round(elapsed, 3),
+            'chunks_per_sec': round(len(texts) / elapsed, 1) if elapsed else None,
+            'batch_size': self.batch_size,
+            'processes': self.processes if pool is not None else 1,
+        }
+        logger.info(
+            f"Embedded {len(texts)} chunks in {elapsed:.2f}s "
+            f"({self.last_stats['chunks_per_sec']} chunks/sec, {self.last_stats['processes']} process(es))"
+        )
+        return vectors
+
+    def _encode_batch(self, batch):
+        client = self._client
+        if client is None or not hasattr(client, 'encode'):
+            return self.embeddings.embed_documents(batch)
+        vectors = client.encode(
+            batch,
+            batch_size=self.batch_size,
+            normalize_embeddings=self._normalize,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    @staticmethod
+    def _normalize_rows(vectors):
+        import numpy as np
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def _get_pool(self):
+        if not self.pool_enabled:
+            return None
+        client = self._client
+        if client is None or not hasattr(client, 'start_multi_process_pool'):
+            return None
+
+        with self._lock:
+            if self._pool is None and not self._pool_failed:
+                try:
+                    self._pool = client.start_multi_process_pool(target_devices=['cpu'] * self.processes)
+                    logger.info(f"Started embedding pool with {self.processes} processes")
+                except Exception as e:
+                    self._pool_failed = True
+                    logger.warning(f"Could not start embedding pool, encoding in-process: {e}")
+            return self._pool
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._client.stop_multi_process_pool(self._pool)
+                self._pool = None
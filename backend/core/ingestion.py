@@ -0,0 +1,325 @@
+"""
+Ingestion-only helpers: PDF parsing, table extraction and article scraping.
+
+Kept out of core.rag_processor so query-serving processes never import the
+PDF and scraping libraries; the processor imports this module on first use.
+"""
+import gc
+import hashlib
+import logging
+import time
+from urllib.parse import urlparse
+
+import pandas as pd
+import pdfplumber
+import requests
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+from newspaper import Article
+
+logger = logging.getLogger(__name__)
+
+# Pages between full garbage collections while streaming a PDF (see iter_pages)
+PDF_GC_INTERVAL_PAGES = 50
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scrape_news_article(url):
+    """Scrape news article with error handling"""
+    try:
+        article = Article(url)
+        article.download()
+        article.parse()
+
+        return {
+            'title': article.title,
+            'text': article.text,
+            'publish_date': article.publish_date,
+            'source': urlparse(url).netloc,
+            'url': url
+        }
+    except Exception as e:
+        logger.warning(f"Article parsing failed for {url}, falling back to BeautifulSoup: {e}")
+        try:
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+            soup = BeautifulSoup(response.content, 'html.parser')
+
+            # Remove script, style, nav, footer, header elements
+            for element in soup(['script', 'style', 'nav', 'footer', 'header']):
+                element.decompose()
+
+            return {
+                'title': soup.title.string if soup.title else 'No title',
+                'text': soup.get_text(separator=' ', strip=True),
+                'source': urlparse(url).netloc,
+                'url': url,
+                'publish_date': None
+            }
+        except Exception as fallback_error:
+            logger.error(f"Both article parsing and BeautifulSoup failed for {url}: {fallback_error}")
+            raise
+
+
+def clean_tables(raw_tables, page_num):
+    """Turn raw pdfplumber cell lists into table dicts; returns (index, table) pairs"""
+    tables = []
+    for table_idx, table in enumerate(raw_tables):
+        try:
+            clean_table = [
+                [str(cell).strip() if cell else "" for cell in row]
+                for row in table
+            ]
+            if len(clean_table) > 1 and any(clean_table[0]):
+                df = pd.DataFrame(clean_table[1:], columns=clean_table[0])
+                table_text = df.to_string(index=False)
+                tables.append((table_idx, {
+                    'content': f"Financial Table (Page {page_num + 1}):\n{table_text}",
+                    'page': page_num + 1,
+                    'table_index': table_idx,
+                    'headers': clean_table[0],
+                    'rows': clean_table[1:]
+                }))
+        except Exception as table_error:
+            logger.warning(f"Error processing table {table_idx} on page {page_num + 1}: {table_error}")
+    return tables
+
+
+def extract_page_tables(page, page_num):
+    """Extract the tables of a single pdfplumber page"""
+    return [table for _, table in clean_tables(page.extract_tables(), page_num)]
+
+
+def outside_regions(bboxes):
+    """pdfplumber object filter dropping characters inside any of the bboxes"""
+    def test(obj):
+        if obj.get('object_type') != 'char':
+            return True
+        x = (obj['x0'] + obj['x1']) / 2
+        y = (obj['top'] + obj['bottom']) / 2
+        return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+    return test
+
+
+def page_may_have_tables(page, min_numeric_ratio=0.0):
+    """
+    Cheap prescan before running the table finder.
+
+    pdfplumber's default ("lines") strategy builds cells from ruling lines and
+    rect edges, so a page without at least two horizontal and two vertical
+    edges can't yield a table. Optionally also requires a minimum share of
+    digits among the page's characters.
+    """
+    horizontal = vertical = 0
+    for edge in page.edges:
+        if edge['orientation'] == 'h':
+            horizontal += 1
+        else:
+            vertical += 1
+    if horizontal < 2 or vertical < 2:
+        return False
+
+    if min_numeric_ratio:
+        chars = [char['text'] for char in page.chars if not char['text'].isspace()]
+        if chars and sum(char.isdigit() for char in chars) / len(chars) < min_numeric_ratio:
+            return False
+    return True
+
+
+def parse_page(page, page_num, find_tables=True, report=None):
+    """
+    Single pass over a pdfplumber page: returns (prose_text, tables).
+
+    Text inside extracted table regions is left out of the prose so the same
+    figures aren't embedded twice. With ``find_tables=False`` the table finder
+    is skipped entirely.
+    """
+    tables = []
+    table_bboxes = []
+    if find_tables:
+        start_time = time.perf_counter()
+        try:
+            found_tables = page.find_tables()
+            cleaned = clean_tables([table.extract() for table in found_tables], page_num)
+            for table_idx, table_info in cleaned:
+                tables.append(table_info)
+                table_bboxes.append(found_tables[table_idx].bbox)
+        except Exception as page_error:
+            logger.warning(f"Error extracting tables from page {page_num + 1}: {page_error}")
+        if report is not None:
+            report['table_seconds'] += time.perf_counter() - start_time
+
+    text_page = page.filter(outside_regions(table_bboxes)) if table_bboxes else page
+    return text_page.extract_text() or "", tables
+
+
+def table_document(table_info, source):
+    return Document(
+        page_content=table_info['content'],
+        metadata={
+            "source": source,
+            "page": table_info['page'],
+            "type": "financial_table",
+            "table_index": table_info['table_index'],
+            "headers": table_info['headers']
+        }
+    )
+
+
+def release_page(page):
+    """Drop pdfplumber's parsed layout/object caches for a finished page"""
+    close = getattr(page, 'close', None) or getattr(page, 'flush_cache', None)
+    if close:
+        close()
+    # Page.root_page and, in newer pdfplumber, the per-instance get_textmap
+    # cache are reference cycles that would keep the page alive until the
+    # next full garbage collection
+    vars(page).pop('root_page', None)
+    vars(page).pop('get_textmap', None)
+
+
+def pdf_page_count(pdf):
+    """Page count from the page tree root, without building pdf.pages"""
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdftypes import resolve1
+
+    try:
+        return int(resolve1(pdf.doc.catalog['Pages'])['Count'])
+    except (KeyError, TypeError, ValueError):
+        return sum(1 for _ in PDFPage.create_pages(pdf.doc))
+
+
+def iter_pages(pdf):
+    """
+    Yield the pages of an open pdfplumber PDF one at a time.
+
+    Unlike pdf.pages this doesn't keep every Page, and it empties pdfminer's
+    document-wide cache of resolved objects and decoded streams before each
+    page, so memory is bounded by the current page plus at most
+    PDF_GC_INTERVAL_PAGES pages of uncollected garbage.
+    """
+    from pdfminer.pdfpage import PDFPage
+
+    # PDF.close() closes every page of pdf.pages and would build them all
+    pdf._pages = []
+    doctop = 0
+    for page_number, page_obj in enumerate(PDFPage.create_pages(pdf.doc), start=1):
+        pdf.doc._cached_objs.clear()
+        pdf.doc._parsed_objs.clear()
+        if page_number % PDF_GC_INTERVAL_PAGES == 0:
+            # pdfminer's content parser is a reference cycle holding the page's
+            # decoded content stream; in a large worker heap the full
+            # collections that free it are rare
+            gc.collect()
+        page = pdfplumber.page.Page(pdf, page_obj, page_number=page_number, initial_doctop=doctop)
+        doctop += page.height
+        yield page
+
+
+def extract_financial_tables(pdf_path):
+    """Extract tables from PDF with enhanced error handling"""
+    tables = []
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_num, page in enumerate(iter_pages(pdf)):
+                try:
+                    tables.extend(extract_page_tables(page, page_num))
+                except Exception as page_error:
+                    logger.warning(f"Error processing page {page_num + 1}: {page_error}")
+                finally:
+                    release_page(page)
+    except Exception as e:
+        logger.error(f"Error opening PDF {pdf_path}: {e}")
+        raise
+
+    logger.info(f"Extracted {len(tables)} tables from {pdf_path}")
+    return tables
+
+
+def new_prescan_report(prescan=True):
+    return {
+        'prescan': prescan,
+        'pages': 0,
+        'pages_scanned': 0,
+        'pages_skipped': 0,
+        'table_seconds': 0.0,
+        'estimated_seconds_saved': 0.0,
+    }
+
+
+def finish_prescan_report(report):
+    if report['pages_scanned']:
+        per_page = report['table_seconds'] / report['pages_scanned']
+        report['estimated_seconds_saved'] = round(per_page * report['pages_skipped'], 3)
+    report['table_seconds'] = round(report['table_seconds'], 3)
+    return report
+
+
+def iter_pdf_pages(file_path, text_splitter, strict=False, min_numeric_ratio=0.0, report=None):
+    """
+    Parse a PDF one page at a time in a single pdfplumber pass.
+
+    Yields ``(page_number, page_count, chunks, tables)`` per page, where chunks
+    are the split prose chunks plus one document per extracted table. Pages
+    are parsed with iter_pages() and released before the next one, so memory
+    doesn't grow with document length.
+
+    Pages that fail the table prescan skip the table finder unless ``strict``
+    is set. Pass a dict from new_prescan_report() as ``report`` to collect
+    pages scanned/skipped and time spent in the table finder.
+    """
+    if report is None:
+        report = new_prescan_report(prescan=not strict)
+
+    with pdfplumber.open(file_path) as pdf:
+        page_count = pdf_page_count(pdf)
+        for page_num, page in enumerate(iter_pages(pdf)):
+            try:
+                scan = strict or page_may_have_tables(page, min_numeric_ratio)
+                report['pages'] += 1
+                report['pages_scanned' if scan else 'pages_skipped'] += 1
+                text, tables = parse_page(page, page_num, find_tables=scan, report=report)
+            finally:
+                release_page(page)
+
+            chunks = []
+            if text.strip():
+                chunks = text_splitter.split_documents([Document(
+                    page_content=text,
+                    metadata={"source": file_path, "page": page_num}
+                )])
+                for chunk_index, chunk in enumerate(chunks):
+                    chunk.metadata["chunk_index"] = chunk_index
+            chunks.extend(table_document(table_info, file_path) for table_info in tables)
+
+            yield page_num + 1, page_count, chunks, tables
+
+    finish_prescan_report(report)
+    logger.info(
+        f"Table prescan for {file_path}: {report['pages_scanned']} pages scanned, "
+        f"{report['pages_skipped']} skipped, ~{report['estimated_seconds_saved']}s saved"
+    )
+
+
+def process_financial_pdf(file_path, text_splitter):
+    """Load PDF and append extracted tables"""
+    try:
+        documents = []
+        tables = []
+        for _, _, page_chunks, page_tables in iter_pdf_pages(file_path, text_splitter):
+            documents.extend(page_chunks)
+            tables.extend(page_tables)
+
+        logger.info(f"Processed PDF with {len(documents)} total chunks ({len(tables)} tables)")
+        return documents, tables
+
+    except Exception as e:
+        logger.error(f"Error processing PDF {file_path}: {e}")
+        raise
@@ -0,0 +1,265 @@
+"""
+Cross-process admission control for LLM generations
+
+A Redis-backed counting semaphore caps concurrent Ollama generations across
+all web processes and workers. Callers wait in a bounded FIFO queue; when the
+queue is full or the wait exceeds the deadline they get LLMBusyError with a
+retry hint instead of piling more load onto the model.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+logger = logging.getLogger(__name__)
+
+HOLDERS_KEY = 'financerag:llm:holders'
+WAITING_KEY = 'financerag:llm:waiting'
+
+# Join the queue unless it is full: returns the queue depth, or -1 if full.
+# Waiters that have been queued longer than any deadline allows are dropped.
+ENQUEUE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[3]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    return -1
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# Take a slot if one is free and the caller is at the head of the queue.
+# Holders whose lease ran out (crashed processes) are released first.
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local free = tonumber(ARGV[2]) - redis.call('ZCARD', KEYS[1])
+if free <= 0 then
+    return 0
+end
+local rank = redis.call('ZRANK', KEYS[2], ARGV[4])
+if rank and rank >= free then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[4])
+redis.call('ZADD', KEYS[1], tonumber(ARGV[1]) + tonumber(ARGV[3]), ARGV[4])
+return 1
+"""
+
+
+class LLMBusyError(Exception):
+    """No generation slot could be obtained; ``status_code`` is 503 (queue full) or 429 (wait timed out)"""
+
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LimiterMetrics:
+    """Process-wide admission counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.generations = 0
+        self.generation_seconds = 0.0
+
+    def record_admitted(self, waited):
+        with self._lock:
+            self.admitted += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def record_rejected(self, queue_full):
+        with self._lock:
+            if queue_full:
+                self.rejected_queue_full += 1
+            else:
+                self.rejected_timeout += 1
+
+    def record_generation(self, seconds):
+        with self._lock:
+            self.generations += 1
+            self.generation_seconds += seconds
+
+    @property
+    def avg_generation_seconds(self):
+        with self._lock:
+            return self.generation_seconds / self.generations if self.generations else None
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+                'avg_wait_ms': int(self.wait_seconds / self.admitted * 1000) if self.admitted else 0,
+                'max_wait_ms': int(self.max_wait_seconds * 1000),
+                'avg_generation_ms': (
+                    int(self.generation_seconds / self.generations * 1000) if self.generations else None
+                ),
+            }
+
+
+limiter_metrics = LimiterMetrics()
+
+
+class LLMLimiter:
+    """
+    Allows ``max_concurrency`` generations at a time across processes
+    (0 disables the limiter). Slots are leases that expire after
+    ``lease_seconds`` so a crashed process can't hold one forever. If Redis is
+    unreachable, requests are let through.
+    """
+
+    def __init__(self, redis_url, max_concurrency=2, max_queue=20, queue_timeout=30,
+                 lease_seconds=150, poll_interval=0.1):
+        self.redis_url = redis_url
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._redis = None
+
+    @property
+    def enabled(self):
+        return self.max_concurrency > 0
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url)
+            self._enqueue = self._redis.register_script(ENQUEUE_SCRIPT)
+            self._acquire = self._redis.register_script(ACQUIRE_SCRIPT)
+        return self._redis
+
+    def retry_after(self, queue_depth=None):
+        """Seconds until a retry is likely to be admitted"""
+        if queue_depth is None:
+            queue_depth = self.max_queue
+        per_generation = limiter_metrics.avg_generation_seconds or 10
+        return max(1, math.ceil(per_generation * (queue_depth + 1) / max(self.max_concurrency, 1)))
+
+    def _join_queue(self, token):
+        """Returns False if Redis is down and the request should just proceed"""
+        try:
+            self.redis
+            depth = self._enqueue(
+                keys=[WAITING_KEY],
+                args=[time.time(), self.max_queue, self.queue_timeout + 5, token]
+            )
+        except Exception as e:
+            logger.warning(f"LLM limiter unavailable, admitting without a slot: {e}")
+            return False
+
+        if depth == -1:
+            limiter_metrics.record_rejected(queue_full=True)
+            raise LLMBusyError(
+                'Too many questions are waiting for the model, please retry later.',
+                status_code=503,
+                retry_after=self.retry_after()
+            )
+        return True
+
+    def _try_acquire(self, token):
+        try:
+            return self._acquire(
+                keys=[HOLDERS_KEY, WAITING_KEY],
+                args=[time.time(), self.max_concurrency, self.lease_seconds, token]
+            ) == 1
+        except Exception as e:
+            logger.warning(f"LLM limiter unavailable, admitting without a slot: {e}")
+            return True
+
+    def _give_up(self, token, waited):
+        try:
+            self.redis.zrem(WAITING_KEY, token)
+            depth = self.redis.zcard(WAITING_KEY)
+        except Exception:
+            depth = None
+        limiter_metrics.record_rejected(queue_full=False)
+        raise LLMBusyError(
+            f'The model is busy, no generation slot within {self.queue_timeout}s.',
+            status_code=429,
+            retry_after=self.retry_after(depth)
+        )
+
+    def _release(self, token):
+        try:
+            self.redis.zrem(HOLDERS_KEY, token)
+        except Exception as e:
+            logger.warning(f"Could not release LLM slot, it expires with its lease: {e}")
+
+    @contextmanager
+    def slot(self):
+        """Hold a generation slot for the duration of the block"""
+        if not self.enabled:
+            yield
+            return
+
+        token = uuid.uuid4().hex
+        start_time = time.monotonic()
+        if not self._join_queue(token):
+            yield
+            return
+
+        while not self._try_acquire(token):
+            waited = time.monotonic() - start_time
+            if waited >= self.queue_timeout:
+                self._give_up(token, waited)
+            time.sleep(self.poll_interval)
+
+        limiter_metrics.record_admitted(time.monotonic() - start_time)
+        generation_start = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter_metrics.record_generation(time.monotonic() - generation_start)
+            self._release(token)
+
+    @asynccontextmanager
+    async def aslot(self):
+        """slot() for the async path: each Redis round trip runs in a thread, waiting doesn't"""
+        if not self.enabled:
+            yield
+            return
+
+        token = uuid.uuid4().hex
+        start_time = time.monotonic()
+        if not await asyncio.to_thread(self._join_queue, token):
+            yield
+            return
+
+        while not await asyncio.to_thread(self._try_acquire, token):
+            waited = time.monotonic() - start_time
+            if waited >= self.queue_timeout:
+                await asyncio.to_thread(self._give_up, token, waited)
+            await asyncio.sleep(self.poll_interval)
+
+        limiter_metrics.record_admitted(time.monotonic() - start_time)
+        generation_start = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter_metrics.record_generation(time.monotonic() - generation_start)
+            await asyncio.to_thread(self._release, token)
+
+    def metrics(self):
+        """Process counters plus the current cluster-wide queue depth and in-flight generations"""
+        data = dict(limiter_metrics.as_dict(), enabled=self.enabled, max_concurrency=self.max_concurrency)
+        if self.enabled:
+            try:
+                now = time.time()
+                data['in_flight'] = self.redis.zcount(HOLDERS_KEY, now, '+inf')
+                data['queue_depth'] = self.redis.zcard(WAITING_KEY)
+            except Exception as e:
+                data['error'] = str(e)
+        return data
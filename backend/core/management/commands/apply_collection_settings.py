@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.registry import rag_registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the HNSW, on-disk and quantization settings from RAG_SETTINGS to existing "
+        "company collections, and create missing payload indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', action='append', help='Collection to update (repeatable, default: all company_ collections)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def handle(self, *args, **options):
+        from core.vector_store import apply_collection_settings, ensure_payload_indexes
+
+        client = rag_registry.get_qdrant_client()
+        collection_names = options['collection'] or [
+            collection.name for collection in client.get_collections().collections
+            if collection.name.startswith('company_')
+        ]
+        if not collection_names:
+            self.stdout.write("No collections to update")
+            return
+
+        for collection_name in collection_names:
+            try:
+                changes = apply_collection_settings(
+                    client, collection_name, settings.RAG_SETTINGS, dry_run=options['dry_run']
+                )
+                if not options['dry_run']:
+                    ensure_payload_indexes(client, collection_name)
+            except Exception as e:
+                raise CommandError(f"Could not update {collection_name}: {e}")
+
+            if not changes:
+                self.stdout.write(f"{collection_name}: up to date")
+            elif options['dry_run']:
+                self.stdout.write(f"{collection_name}: would update {', '.join(changes)}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{collection_name}: updated {', '.join(changes)}"))
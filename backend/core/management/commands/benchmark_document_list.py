@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.testing import api_client, create_documents, rolled_back
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare response size and time of the documents list with tables inlined "
+        "(the former list representation), the summary representation and a sparse fieldset"
+    )
+
+    VARIANTS = {
+        'inline tables': '?expand=extracted_tables',
+        'summary': '',
+        'fields': '?fields=id,original_filename,status,tables_count',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=20, help='Documents in the sample data (one page is 20)')
+        parser.add_argument('--tables', type=int, default=30, help='Extracted tables per document')
+        parser.add_argument('--rows', type=int, default=40, help='Rows per table')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per variant; the median time is reported')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            user = self._create_sample_data(options)
+            results = {
+                name: self._measure(user, f'/api/v1/documents/pdfs/{params}', options['repeat'])
+                for name, params in self.VARIANTS.items()
+            }
+
+        baseline_bytes, baseline_ms = results['inline tables']
+        for name, (size, median_ms) in results.items():
+            self.stdout.write(
+                f"{name:>14}: {size / 1024:9.1f} KiB  {median_ms:8.1f} ms  "
+                f"({size / baseline_bytes:6.1%} of the size, {median_ms / baseline_ms:6.1%} of the time)"
+            )
+
+    def _measure(self, user, path, repeat):
+        client = api_client(user)
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start_time = time.perf_counter()
+            response = client.get(path)
+            timings.append((time.perf_counter() - start_time) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"GET {path} returned {response.status_code}")
+        return len(response.content), statistics.median(timings)
+
+    def _create_sample_data(self, options):
+        from companies.models import Company
+
+        user = User.objects.create(username='document-list-benchmark')
+        company = Company.objects.create(name='Document List Benchmark', created_by=user)
+        create_documents(
+            company, user, options['documents'], tables=options['tables'], table_rows=options['rows'],
+            status='completed', tables_count=options['tables']
+        )
+        return user
@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.registry import RAGResourceRegistry
+from core.testing import PARITY_MIN_COSINE, SAMPLE_TEXTS, cosine
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the torch and ONNX embedding backends: cosine parity, query latency "
+        "and document throughput. Exits non-zero if parity is below --min-cosine."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--texts-file', help='File with one text per line (defaults to built-in samples)')
+        parser.add_argument('--repeat', type=int, default=20, help='Repeat the texts to build the throughput corpus')
+        parser.add_argument('--min-cosine', type=float, default=PARITY_MIN_COSINE, help='Minimum per-text cosine agreement')
+
+    def handle(self, *args, **options):
+        texts = SAMPLE_TEXTS
+        if options['texts_file']:
+            with open(options['texts_file']) as f:
+                texts = [line.strip() for line in f if line.strip()]
+        corpus = texts * max(options['repeat'], 1)
+
+        vectors = {}
+        for backend in ('torch', 'onnx'):
+            rag_settings = dict(settings.RAG_SETTINGS, EMBEDDING_BACKEND=backend)
+            try:
+                start_time = time.perf_counter()
+                embeddings = RAGResourceRegistry._load_embeddings(rag_settings)
+                load_ms = (time.perf_counter() - start_time) * 1000
+            except Exception as e:
+                raise CommandError(f"Could not load {backend} backend: {e}")
+
+            embeddings.embed_query("warm up")
+
+            latencies = []
+            for text in texts:
+                start_time = time.perf_counter()
+                embeddings.embed_query(text)
+                latencies.append((time.perf_counter() - start_time) * 1000)
+
+            start_time = time.perf_counter()
+            embeddings.embed_documents(corpus)
+            elapsed = time.perf_counter() - start_time
+
+            vectors[backend] = embeddings.embed_documents(texts)
+            latencies.sort()
+            self.stdout.write(
+                f"{backend:>5}: load {load_ms:.0f}ms | query p50 {statistics.median(latencies):.1f}ms "
+                f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:.1f}ms | "
+                f"{len(corpus) / elapsed:.1f} chunks/sec over {len(corpus)} chunks"
+            )
+
+        cosines = [
+            cosine(torch_vector, onnx_vector)
+            for torch_vector, onnx_vector in zip(vectors['torch'], vectors['onnx'])
+        ]
+        self.stdout.write(
+            f"Cosine agreement: min {min(cosines):.4f}, mean {statistics.mean(cosines):.4f}"
+        )
+
+        if min(cosines) < options['min_cosine']:
+            raise CommandError(
+                f"ONNX embeddings diverge from torch: min cosine {min(cosines):.4f} < {options['min_cosine']}"
+            )
+        self.stdout.write(self.style.SUCCESS("ONNX backend matches the torch backend"))
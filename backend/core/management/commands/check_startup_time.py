@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.startup import measure_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Run `manage.py check` in a fresh interpreter and fail if it exceeds the "
+        "startup time budget or imports ingestion/ML dependencies"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms', type=int, default=settings.STARTUP_IMPORT_BUDGET_MS,
+            help='Maximum wall time for `manage.py check` in milliseconds'
+        )
+        parser.add_argument(
+            '--runs', type=int, default=3,
+            help='Number of runs; the fastest one is compared against the budget'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            best_ms, heavy_imports = measure_startup(options['runs'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"manage.py check: best {best_ms}ms over {max(options['runs'], 1)} run(s) "
+            f"(budget {options['budget_ms']}ms)"
+        )
+
+        if heavy_imports:
+            raise CommandError(
+                f"Startup imports heavy modules: {', '.join(sorted(heavy_imports))}"
+            )
+        if best_ms > options['budget_ms']:
+            raise CommandError(
+                f"Startup took {best_ms}ms, over the {options['budget_ms']}ms budget"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Startup import budget OK"))
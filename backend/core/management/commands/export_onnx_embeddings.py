@@ -0,0 +1,61 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Export the embedding model to ONNX and write a dynamic int8 quantized copy"
+
+    def add_arguments(self, parser):
+        rag_settings = settings.RAG_SETTINGS
+        parser.add_argument('--model', default=rag_settings['EMBEDDING_MODEL'], help='HuggingFace model name or path')
+        parser.add_argument('--output', default=rag_settings['ONNX_MODEL_PATH'], help='Output directory')
+        parser.add_argument('--opset', type=int, default=14)
+        parser.add_argument('--skip-quantize', action='store_true', help='Only write the fp32 model.onnx')
+
+    def handle(self, *args, **options):
+        import torch
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from transformers import AutoModel, AutoTokenizer
+
+        output_dir = options['output']
+        os.makedirs(output_dir, exist_ok=True)
+        fp32_path = os.path.join(output_dir, 'model.onnx')
+        int8_path = os.path.join(output_dir, 'model_quantized.onnx')
+
+        self.stdout.write(f"Loading {options['model']}...")
+        try:
+            tokenizer = AutoTokenizer.from_pretrained(options['model'])
+            model = AutoModel.from_pretrained(options['model'])
+        except Exception as e:
+            raise CommandError(f"Could not load {options['model']}: {e}")
+        model.eval()
+
+        sample = tokenizer(["Total revenue for fiscal year 2023"], return_tensors='pt')
+        input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+        self.stdout.write(f"Exporting to {fp32_path}...")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=['last_hidden_state'],
+                dynamic_axes=dynamic_axes,
+                opset_version=options['opset'],
+                do_constant_folding=True,
+            )
+        tokenizer.save_pretrained(output_dir)
+
+        if not options['skip_quantize']:
+            self.stdout.write(f"Quantizing to {int8_path}...")
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {options['model']} to {output_dir}. "
+            f"Set EMBEDDING_BACKEND=onnx and ONNX_MODEL_PATH={output_dir} to use it."
+        ))
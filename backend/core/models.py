@@ -0,0 +1,21 @@
+from django.db import models
+from django.utils import timezone
+
+
+class EmbeddingCacheEntry(models.Model):
+    """Embedding of a normalized chunk text, keyed by model and content hash"""
+    model_name = models.CharField(max_length=255)
+    text_hash = models.CharField(max_length=64)  # sha256 of the normalized text
+    dimensions = models.IntegerField()
+    vector = models.BinaryField()  # float32 array
+
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ['model_name', 'text_hash']
+        verbose_name_plural = "Embedding cache entries"
+
+    def __str__(self):
+        return f"{self.model_name}:{self.text_hash[:12]}"
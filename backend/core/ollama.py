@@ -0,0 +1,37 @@
+"""
+Async Ollama client for the ASGI query path (the sync path uses langchain's Ollama)
+"""
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOllamaClient:
+    """Calls Ollama's /api/generate over a pooled httpx.AsyncClient"""
+
+    def __init__(self, base_url, model, temperature=0.1, timeout=120, pool_size=100):
+        self.model = model
+        self.temperature = temperature
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=10),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    def _payload(self, prompt, stream):
+        return {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': stream,
+            'options': {'temperature': self.temperature},
+        }
+
+    async def generate(self, prompt):
+        response = await self.client.post('/api/generate', json=self._payload(prompt, stream=False))
+        response.raise_for_status()
+        return response.json().get('response', '')
+
+    async def aclose(self):
+        await self.client.aclose()
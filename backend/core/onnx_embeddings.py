@@ -0,0 +1,77 @@
+"""
+ONNX Runtime embedding backend (CPU, optionally int8-quantized)
+
+The model directory is produced by `manage.py export_onnx_embeddings` and holds
+the tokenizer files plus model.onnx / model_quantized.onnx.
+"""
+import logging
+import os
+
+import numpy as np
+import onnxruntime as ort
+from langchain_core.embeddings import Embeddings
+from transformers import AutoTokenizer
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self, model_path, model_file='model_quantized.onnx', model_name=None,
+                 pooling='cls', normalize=True, max_length=512, batch_size=32, num_threads=0):
+        self.model_path = model_path
+        self.model_name = model_name or model_path
+        self.pooling = pooling
+        self.normalize = normalize
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_path, model_file),
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model {self.model_name} from {model_path}/{model_file}")
+
+    def _encode(self, texts):
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors='np'
+        )
+        inputs = {
+            name: encoded[name].astype(np.int64)
+            for name in ('input_ids', 'attention_mask', 'token_type_ids')
+            if name in self.input_names and name in encoded
+        }
+        hidden_states = self.session.run(None, inputs)[0]
+
+        if self.pooling == 'mean':
+            mask = encoded['attention_mask'][..., None].astype(hidden_states.dtype)
+            vectors = (hidden_states * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        else:
+            vectors = hidden_states[:, 0]
+
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.clip(norms, 1e-12, None)
+        return vectors
+
+    def embed_documents(self, texts):
+        # Same preprocessing as HuggingFaceEmbeddings so both backends agree
+        texts = [text.replace("\n", " ") for text in texts]
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode(texts[start:start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
@@ -1,34 +1,16 @@
 """
 Django wrapper for the FinancialRAGProcessor
+
+Heavy dependencies (langchain, Qdrant, PDF/scraping libraries) are imported on
+first use so importing this module stays cheap for web processes and manage.py.
 """
-import os
-import warnings
-import tempfile
-import requests
-from bs4 import BeautifulSoup
-import pdfplumber
-import pandas as pd
-import time
 import logging
-
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.schema import Document
-from langchain_core._api import LangChainDeprecationWarning
-
-from transformers import pipeline
-import torch
-from qdrant_client import QdrantClient
-from qdrant_client.http import exceptions as qdrant_exceptions
-from newspaper import Article
-from urllib.parse import urlparse
+import time
+import warnings
 
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
-warnings.filterwarnings("ignore", category=LangChainDeprecationWarning)
 
 
 class DjangoFinancialRAGProcessor:
@@ -36,16 +18,36 @@ class DjangoFinancialRAGProcessor:
     Django-integrated version of FinancialRAGProcessor
     """
     
-    def __init__(self):
+    def __init__(self, registry=None):
+        from langchain_core._api import LangChainDeprecationWarning
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        warnings.filterwarnings("ignore", category=LangChainDeprecationWarning)
+
         # Get settings from Django configuration
         rag_settings = settings.RAG_SETTINGS
-        
-        # Initialize Embedding Model
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=rag_settings['EMBEDDING_MODEL'],
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
+
+        # Heavy resources are shared process-wide through the registry
+        if registry is None:
+            from .registry import rag_registry as registry
+
+        # Embedding Model
+        self.embeddings = registry.get_embeddings()
+
+        # Ingestion embeds in length-sorted batches, through the content-addressed cache
+        from .embedding_engine import EmbeddingEngine
+        self.embedding_engine = EmbeddingEngine(
+            self.embeddings,
+            batch_size=rag_settings.get('EMBEDDING_BATCH_SIZE', 32),
+            processes=rag_settings.get('EMBEDDING_PROCESSES', 0)
         )
+        self.document_embeddings = self.embedding_engine
+        if rag_settings.get('EMBEDDING_CACHE_ENABLED'):
+            from .embedding_cache import CachedEmbeddings
+            self.document_embeddings = CachedEmbeddings(
+                self.embedding_engine,
+                model_name=self.embedding_cache_key(rag_settings),
+                max_entries=rag_settings.get('EMBEDDING_CACHE_MAX_ENTRIES')
+            )
 
         # Text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -54,25 +56,50 @@ class DjangoFinancialRAGProcessor:
         )
 
         # Qdrant client
-        self.qdrant_client = QdrantClient(
-            host=rag_settings['QDRANT_HOST'], 
-            port=rag_settings['QDRANT_PORT']
+        self.qdrant_client = registry.get_qdrant_client()
+
+        # LLM
+        self.llm = registry.get_llm()
+
+        # Dense + sparse retrieval fused with RRF
+        from .retrieval import HybridRetriever
+        self.retriever = HybridRetriever(self.qdrant_client, self.embeddings, rag_settings)
+
+        # Retrieved chunks are packed into a token budget counted with the LLM's tokenizer
+        from .context import ContextPacker, TokenCounter
+        self.token_counter = TokenCounter(registry.get_tokenizer())
+        self.context_packer = ContextPacker(
+            self.token_counter,
+            token_budget=rag_settings.get('CONTEXT_TOKEN_BUDGET', 1500),
+            mmr_lambda=rag_settings.get('CONTEXT_MMR_LAMBDA', 0.7),
+            duplicate_threshold=rag_settings.get('CONTEXT_DUPLICATE_THRESHOLD', 0.85),
+            max_table_tokens=rag_settings.get('CONTEXT_MAX_TABLE_TOKENS', 400)
+        )
+
+        # Caps concurrent generations across processes
+        from .llm_limiter import LLMLimiter
+        self.llm_limiter = LLMLimiter(
+            redis_url=rag_settings.get('LLM_LIMITER_REDIS_URL', 'redis://localhost:6379/0'),
+            max_concurrency=rag_settings.get('LLM_MAX_CONCURRENCY', 2),
+            max_queue=rag_settings.get('LLM_MAX_QUEUE', 20),
+            queue_timeout=rag_settings.get('LLM_QUEUE_TIMEOUT', 30),
+            # A generation is cut off after OLLAMA_TIMEOUT (see _stream_tokens), plus at
+            # most one more read of OLLAMA_TIMEOUT; the lease must outlast both
+            lease_seconds=2 * rag_settings.get('OLLAMA_TIMEOUT', 120) + 30
         )
 
-        # Initialize LLM
-        self.llm = self._initialize_llm(rag_settings['LLM_MODEL'])
+        # Searched collections mapped to whether they have the sparse vector;
+        # an entry is dropped when a search on the collection fails
+        self._known_collections = {}
         
         logger.info("FinancialRAGProcessor initialized successfully")
 
-    def _initialize_llm(self, model_name):
-        try:
-            from langchain_community.llms import Ollama
-            llm = Ollama(model=model_name, temperature=0.1)
-            logger.info(f"Using Ollama with {model_name}")
-            return llm
-        except Exception as e:
-            logger.error(f'Could not load LLM model {model_name}: {e}')
-            return None
+    @staticmethod
+    def embedding_cache_key(rag_settings):
+        """Cached vectors are only valid for the same model and backend"""
+        if rag_settings.get('EMBEDDING_BACKEND', 'torch') == 'onnx':
+            return f"{rag_settings['EMBEDDING_MODEL']}@onnx:{rag_settings.get('ONNX_MODEL_FILE', 'model_quantized.onnx')}"
+        return rag_settings['EMBEDDING_MODEL']
 
     def create_prompt(self, question, context, company_name):
         return f"""<|system|>
@@ -88,221 +115,414 @@ Context: {context}
 
     def scrape_news_article(self, url):
         """Scrape news article with error handling"""
-        try:
-            article = Article(url)
-            article.download()
-            article.parse()
-
-            return {
-                'title': article.title,
-                'text': article.text,
-                'publish_date': article.publish_date,
-                'source': urlparse(url).netloc,
-                'url': url
-            }
-        except Exception as e:
-            logger.warning(f"Article parsing failed for {url}, falling back to BeautifulSoup: {e}")
-            try:
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
-
-                # Remove script, style, nav, footer, header elements
-                for element in soup(['script', 'style', 'nav', 'footer', 'header']):
-                    element.decompose()
-
-                return {
-                    'title': soup.title.string if soup.title else 'No title',
-                    'text': soup.get_text(separator=' ', strip=True),
-                    'source': urlparse(url).netloc,
-                    'url': url,
-                    'publish_date': None
-                }
-            except Exception as fallback_error:
-                logger.error(f"Both article parsing and BeautifulSoup failed for {url}: {fallback_error}")
-                raise
+        from . import ingestion
+        return ingestion.scrape_news_article(url)
 
     def extract_financial_tables(self, pdf_path):
         """Extract tables from PDF with enhanced error handling"""
-        tables = []
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    try:
-                        page_tables = page.extract_tables()
-                        if page_tables:
-                            for table_idx, table in enumerate(page_tables):
-                                try:
-                                    clean_table = [
-                                        [str(cell).strip() if cell else "" for cell in row]
-                                        for row in table
-                                    ]
-                                    if len(clean_table) > 1 and any(clean_table[0]):
-                                        df = pd.DataFrame(clean_table[1:], columns=clean_table[0])
-                                        table_text = df.to_string(index=False)
-                                        tables.append({
-                                            'content': f"Financial Table (Page {page_num + 1}):\n{table_text}",
-                                            'page': page_num + 1,
-                                            'table_index': table_idx,
-                                            'headers': clean_table[0],
-                                            'rows': clean_table[1:]
-                                        })
-                                except Exception as table_error:
-                                    logger.warning(f"Error processing table {table_idx} on page {page_num + 1}: {table_error}")
-                    except Exception as page_error:
-                        logger.warning(f"Error processing page {page_num + 1}: {page_error}")
-        except Exception as e:
-            logger.error(f"Error opening PDF {pdf_path}: {e}")
-            raise
-        
-        logger.info(f"Extracted {len(tables)} tables from {pdf_path}")
-        return tables
+        from . import ingestion
+        return ingestion.extract_financial_tables(pdf_path)
 
     def process_financial_pdf(self, file_path):
         """Load PDF and append extracted tables"""
-        try:
-            loader = PyPDFLoader(file_path)
-            documents = loader.load_and_split()
-            
-            # Extract tables
-            tables = self.extract_financial_tables(file_path)
-            
-            # Add tables as separate documents
-            for table_info in tables:
-                documents.append(Document(
-                    page_content=table_info['content'],
-                    metadata={
-                        "source": file_path, 
-                        "page": table_info['page'], 
-                        "type": "financial_table",
-                        "table_index": table_info['table_index'],
-                        "headers": table_info['headers']
-                    }
-                ))
-            
-            logger.info(f"Processed PDF with {len(documents)} total chunks ({len(tables)} tables)")
-            return documents, tables
-            
-        except Exception as e:
-            logger.error(f"Error processing PDF {file_path}: {e}")
-            raise
+        from . import ingestion
+        return ingestion.process_financial_pdf(file_path, self.text_splitter)
+
+    def add_to_knowledge_base(self, content, content_type, company_name, progress_callback=None,
+                              source_key=None, source_exists=None):
+        """
+        Add documents to Qdrant with improved error handling.
+
+        PDFs are streamed: each page is parsed, split, embedded and upserted in
+        micro-batches of INGEST_BATCH_SIZE chunks (at least EMBEDDING_BATCH_SIZE
+        x EMBEDDING_PROCESSES with an encode pool), so memory stays flat and the
+        first chunks are searchable before the whole document is done.
+        ``progress_callback(pages_done, page_count)`` is called after each page.
+
+        Point ids are derived from ``source_key`` (e.g. "document:12"), page
+        and chunk offset, so re-ingesting a source is an idempotent upsert and
+        two sources with the same file keep their own points. The content key
+        (file hash or URL) is stored in the payload only. Points of the source
+        left over from an earlier run are deleted once the new run has been written.
+
+        ``source_exists()`` is checked once the chunks are written; if the
+        source was deleted meanwhile, all of its points are removed instead and
+        the result has ``source_deleted`` set.
+        """
+        import uuid
+        from langchain_core.documents import Document
+        from .vector_store import delete_source_points, delete_stale_points
 
-    def add_to_knowledge_base(self, content, content_type, company_name):
-        """Add documents to Qdrant with improved error handling"""
         collection_name = f"company_{company_name.lower().replace(' ', '_').replace('.', '')}"
+        ingest_run = uuid.uuid4().hex
+        # Collection state is looked up once per run: another process may have
+        # deleted or recreated the collection since the last one
+        known_collections = {}
+        # Micro-batches must be large enough for the encode pool to take them
+        batch_size = max(settings.RAG_SETTINGS.get('INGEST_BATCH_SIZE', 64), self.embedding_engine.pool_batch_size)
+        stats = {'chunks': 0, 'seconds': 0.0}
+        tables = []
+        pages_processed = None
+        prescan_report = None
         
         try:
-            if content_type == "news":
-                article_content = self.scrape_news_article(content)
-                documents = [Document(
-                    page_content=article_content['text'],
-                    metadata={
-                        "source": article_content['source'],
-                        "title": article_content['title'],
-                        "type": "news",
-                        "company": company_name,
-                        "date": str(article_content.get('publish_date', '')),
-                        "url": article_content['url']
-                    }
-                )]
-                texts = self.text_splitter.split_documents(documents)
-                tables = []
-
-            elif content_type == "pdf":
-                texts, tables = self.process_financial_pdf(content)
-                for doc in texts:
-                    doc.metadata.update({"company": company_name, "type": "financial_report"})
-
+            if content_type == "pdf":
+                from . import ingestion
+                content_key = f"sha256:{ingestion.file_sha256(content)}"
             else:
-                raise ValueError(f"Unsupported content type: {content_type}")
-
-            # Add to Qdrant
-            vector_store = QdrantVectorStore.from_documents(
-                texts,
-                self.embeddings,
-                url=f"http://{settings.RAG_SETTINGS['QDRANT_HOST']}:{settings.RAG_SETTINGS['QDRANT_PORT']}",
-                collection_name=collection_name,
-            )
+                content_key = f"url:{content}"
+            source_key = source_key or content_key
+            point_tags = {"source_key": source_key, "content_key": content_key, "ingest_run": ingest_run}
+
+            session = self._upsert_session(collection_name)
+            with session:
+                if content_type == "news":
+                    article_content = self.scrape_news_article(content)
+                    documents = [Document(
+                        page_content=article_content['text'],
+                        metadata={
+                            "source": article_content['source'],
+                            "title": article_content['title'],
+                            "type": "news",
+                            "company": company_name,
+                            "url": article_content['url']
+                        }
+                    )]
+                    # ISO format so the datetime payload index can range-filter it
+                    if article_content.get('publish_date'):
+                        documents[0].metadata["date"] = article_content['publish_date'].isoformat()
+                    texts = self.text_splitter.split_documents(documents)
+                    for chunk_index, doc in enumerate(texts):
+                        doc.metadata["chunk_index"] = chunk_index
+                    self._upsert_chunks(session, texts, stats, point_tags, known_collections)
+                    chunks_added = len(texts)
+
+                elif content_type == "pdf":
+                    chunks_added = 0
+                    buffer = []
+                    strict = settings.RAG_SETTINGS.get('TABLE_PRESCAN_STRICT', False)
+                    prescan_report = ingestion.new_prescan_report(prescan=not strict)
+                    pages = ingestion.iter_pdf_pages(
+                        content,
+                        self.text_splitter,
+                        strict=strict,
+                        min_numeric_ratio=settings.RAG_SETTINGS.get('TABLE_PRESCAN_MIN_NUMERIC_RATIO', 0.0),
+                        report=prescan_report
+                    )
+                    for page_number, page_count, chunks, page_tables in pages:
+                        for doc in chunks:
+                            doc.metadata["company"] = company_name
+                            doc.metadata.setdefault("type", "financial_report")
+                        buffer.extend(chunks)
+                        tables.extend(page_tables)
+                        pages_processed = page_number
+
+                        if len(buffer) >= batch_size:
+                            self._upsert_chunks(session, buffer, stats, point_tags, known_collections)
+                            chunks_added += len(buffer)
+                            buffer = []
+
+                        if progress_callback:
+                            progress_callback(page_number, page_count)
+
+                    if buffer:
+                        self._upsert_chunks(session, buffer, stats, point_tags, known_collections)
+                        chunks_added += len(buffer)
+
+                else:
+                    raise ValueError(f"Unsupported content type: {content_type}")
             
-            logger.info(f"Added {len(texts)} chunks to collection {collection_name}")
+            logger.info(f"Added {chunks_added} chunks to collection {collection_name}")
+
+            # The source's own point deletion may have run before this run's upserts
+            source_deleted = source_exists is not None and not source_exists()
+            if source_deleted:
+                logger.info(f"{source_key} was deleted during ingestion, removing its points")
+                delete_source_points(self.qdrant_client, collection_name, source_key)
+            # Drop chunks of this source that the new run no longer produced
+            elif session.stats['points']:
+                delete_stale_points(self.qdrant_client, collection_name, source_key, ingest_run)
+
+            if hasattr(self.document_embeddings, 'evict'):
+                try:
+                    self.document_embeddings.evict()
+                except Exception as e:
+                    logger.warning(f"Embedding cache eviction failed: {e}")
+
+            stats['seconds'] = round(stats['seconds'], 3)
+            stats['chunks_per_sec'] = round(stats['chunks'] / stats['seconds'], 1) if stats['seconds'] else None
             
             return {
-                'chunks_added': len(texts),
-                'tables_extracted': len(tables) if content_type == "pdf" else 0,
+                'chunks_added': chunks_added,
+                'pages_processed': pages_processed,
+                'table_prescan': prescan_report,
+                'embedding_stats': stats,
+                'upsert_stats': session.stats,
+                'tables_extracted': len(tables),
                 'collection_name': collection_name,
-                'tables': tables if content_type == "pdf" else []
+                'source_key': source_key,
+                'source_deleted': source_deleted,
+                'content_key': content_key,
+                'tables': tables
             }
             
         except Exception as e:
             logger.error(f"Error adding to knowledge base: {e}")
             raise
 
-    def answer_question(self, question, collection_name):
+    def _upsert_session(self, collection_name):
+        from .vector_store import UpsertSession
+
+        rag_settings = settings.RAG_SETTINGS
+        return UpsertSession(
+            self.qdrant_client,
+            collection_name,
+            batch_size=rag_settings.get('UPSERT_BATCH_SIZE', 256),
+            parallel=rag_settings.get('UPSERT_PARALLEL', 2),
+            max_retries=rag_settings.get('UPSERT_MAX_RETRIES', 3)
+        )
+
+    def _upsert_chunks(self, session, documents, stats, point_tags, known_collections):
+        """Embed a micro-batch of chunks and queue it on the upsert session"""
+        from qdrant_client.http import models as qdrant_models
+        from .retrieval import sparse_vector
+        from .vector_store import SPARSE_VECTOR_NAME, chunk_point_id
+
+        if not documents:
+            return
+
+        start_time = time.perf_counter()
+        vectors = self.document_embeddings.embed_documents([doc.page_content for doc in documents])
+        stats['chunks'] += len(documents)
+        stats['seconds'] += time.perf_counter() - start_time
+
+        hybrid = self._ensure_collection(session.collection_name, len(vectors[0]), known_collections)
+
+        # Same payload layout as langchain's QdrantVectorStore
+        points = []
+        for doc, vector in zip(documents, vectors):
+            doc.metadata.update(point_tags)
+            if hybrid:
+                vector = {"": vector, SPARSE_VECTOR_NAME: sparse_vector(doc.page_content)}
+            points.append(qdrant_models.PointStruct(
+                id=chunk_point_id(point_tags['source_key'], doc.metadata),
+                vector=vector,
+                payload={'page_content': doc.page_content, 'metadata': doc.metadata}
+            ))
+        session.add(points)
+
+    def _ensure_collection(self, collection_name, vector_size, known_collections):
+        """
+        Create the collection and its payload indexes unless it is already in
+        ``known_collections`` (scoped to one ingestion run). Returns whether
+        the collection has the sparse vector.
+        """
+        from .vector_store import create_collection, ensure_payload_indexes, has_sparse_vectors
+
+        if collection_name in known_collections:
+            return known_collections[collection_name]
+
+        try:
+            collection_info = self.qdrant_client.get_collection(collection_name)
+            ensure_payload_indexes(self.qdrant_client, collection_name, collection_info.payload_schema or {})
+        except Exception:
+            try:
+                create_collection(self.qdrant_client, collection_name, vector_size, settings.RAG_SETTINGS)
+                logger.info(f"Created collection {collection_name}")
+            except Exception:
+                # Another worker may have created it in the meantime
+                pass
+            collection_info = self.qdrant_client.get_collection(collection_name)
+            ensure_payload_indexes(self.qdrant_client, collection_name, collection_info.payload_schema or {})
+
+        known_collections[collection_name] = has_sparse_vectors(collection_info)
+        return known_collections[collection_name]
+
+    def _has_sparse_vectors(self, collection_name):
+        from .vector_store import has_sparse_vectors
+
+        if collection_name not in self._known_collections:
+            collection_info = self.qdrant_client.get_collection(collection_name)
+            self._known_collections[collection_name] = has_sparse_vectors(collection_info)
+        return self._known_collections[collection_name]
+
+    def search_filter(self, filters):
+        """
+        Qdrant filter for ``filters`` as accepted by QueryRequestSerializer:
+        ``types``, ``document_ids`` and ``date_from``
+        """
+        from .vector_store import search_filter
+
+        if not filters:
+            return None
+        return search_filter(
+            types=filters.get('types'),
+            source_keys=[f"document:{document_id}" for document_id in filters.get('document_ids') or []],
+            date_from=filters.get('date_from')
+        )
+
+    def _build_prompt(self, question, collection_name, filters=None):
+        """
+        Retrieve and pack the context for ``question``. Returns
+        (packed documents, prompt, prompt tokens, company name); the documents
+        are empty when nothing relevant was found.
+        """
+        # Hybrid retrieval falls back to dense-only on collections without the sparse vector
+        hybrid = (
+            settings.RAG_SETTINGS.get('HYBRID_SEARCH_ENABLED', True)
+            and self._has_sparse_vectors(collection_name)
+        )
+        try:
+            relevant_docs = self.retriever.retrieve(
+                question,
+                collection_name,
+                qdrant_filter=self.search_filter(filters),
+                hybrid=hybrid
+            )
+        except Exception:
+            # The collection may have been deleted or recreated by another process
+            self._known_collections.pop(collection_name, None)
+            raise
+        return self._pack_prompt(question, collection_name, relevant_docs)
+
+    def _pack_prompt(self, question, collection_name, relevant_docs):
+        """Second half of _build_prompt, shared with the async path"""
+        relevant_docs, context, _ = self.context_packer.pack(question, relevant_docs)
+
+        company_name = collection_name.replace('company_', '').replace('_', ' ').title()
+        if not relevant_docs:
+            return relevant_docs, None, 0, company_name
+
+        prompt = self.create_prompt(question, context, company_name)
+        return relevant_docs, prompt, self.token_counter.count(prompt), company_name
+
+    def _no_context_result(self):
+        return {
+            "answer": "I couldn't find relevant information to answer your question.",
+            "sources": [],
+            "context_found": False
+        }
+
+    def _llm_unavailable_result(self, relevant_docs, prompt_tokens):
+        return {
+            "answer": "LLM model is not available. Please check the configuration.",
+            "sources": self._format_sources(relevant_docs),
+            "context_found": True,
+            "prompt_tokens": prompt_tokens,
+            "llm_error": True
+        }
+
+    def answer_question(self, question, collection_name, filters=None):
         """RAG pipeline with enhanced error handling"""
         try:
-            vector_store = QdrantVectorStore(
-                client=self.qdrant_client,
-                collection_name=collection_name,
-                embedding=self.embeddings
+            relevant_docs, prompt, prompt_tokens, company_name = self._build_prompt(
+                question, collection_name, filters
             )
-
-            retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-            relevant_docs = retriever.invoke(question)
             
             if not relevant_docs:
-                return {
-                    "answer": "I couldn't find relevant information to answer your question.",
-                    "sources": [],
-                    "context_found": False
-                }
-
-            context = "\n\n".join([doc.page_content for doc in relevant_docs])
-            company_name = collection_name.replace('company_', '').replace('_', ' ').title()
-            prompt = self.create_prompt(question, context, company_name)
+                return self._no_context_result()
 
             # Generate answer
             if not self.llm:
-                return {
-                    "answer": "LLM model is not available. Please check the configuration.",
-                    "sources": self._format_sources(relevant_docs),
-                    "context_found": True
-                }
-
-            try:
-                if hasattr(self.llm, "invoke"):
-                    result = self.llm.invoke(prompt)
-                    answer = result if isinstance(result, str) else str(result)
-                else:
-                    result = self.llm(
-                        prompt,
-                        max_new_tokens=500,
-                        temperature=0.1,
-                        do_sample=True
-                    )
-                    if isinstance(result, str):
-                        answer = result.strip()
-                    elif isinstance(result, list) and len(result) > 0:
-                        if 'generated_text' in result[0]:
-                            answer = result[0]['generated_text'].strip()
-                        else:
-                            answer = str(result[0]).strip()
+                return self._llm_unavailable_result(relevant_docs, prompt_tokens)
+
+            generation_failed = False
+            # Raises LLMBusyError if no generation slot frees up in time
+            with self.llm_limiter.slot():
+                try:
+                    if hasattr(self.llm, "stream"):
+                        answer = "".join(self._stream_tokens(prompt))
                     else:
-                        answer = str(result).strip()
-            except Exception as llm_error:
-                logger.error(f"LLM generation error: {llm_error}")
-                answer = f"Error generating response: {str(llm_error)}"
+                        result = self.llm(
+                            prompt,
+                            max_new_tokens=500,
+                            temperature=0.1,
+                            do_sample=True
+                        )
+                        if isinstance(result, str):
+                            answer = result.strip()
+                        elif isinstance(result, list) and len(result) > 0:
+                            if 'generated_text' in result[0]:
+                                answer = result[0]['generated_text'].strip()
+                            else:
+                                answer = str(result[0]).strip()
+                        else:
+                            answer = str(result).strip()
+                except Exception as llm_error:
+                    logger.error(f"LLM generation error: {llm_error}")
+                    answer = f"Error generating response: {str(llm_error)}"
+                    generation_failed = True
 
             return {
                 "answer": answer,
                 "sources": self._format_sources(relevant_docs),
                 "context_found": True,
-                "company": company_name
+                "company": company_name,
+                "prompt_tokens": prompt_tokens,
+                "llm_error": generation_failed
             }
             
         except Exception as e:
             logger.error(f"Error in answer_question: {e}")
             raise
 
+    def _stream_tokens(self, prompt):
+        """
+        Generated pieces of text. The client timeout only bounds each read, so
+        the generation is stopped once it has run for OLLAMA_TIMEOUT seconds and
+        can't outlive its limiter slot.
+        """
+        timeout = settings.RAG_SETTINGS.get('OLLAMA_TIMEOUT', 120)
+        deadline = time.monotonic() + timeout
+        for chunk in self.llm.stream(prompt):
+            text = chunk if isinstance(chunk, str) else getattr(chunk, 'content', str(chunk))
+            if text:
+                yield text
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Generation took longer than {timeout}s")
+
+    def stream_answer(self, question, collection_name, filters=None):
+        """
+        Streaming variant of answer_question, yielding (event, data) pairs:
+        ("sources", {...}) right after retrieval, ("token", text) for each
+        generated piece, and finally ("done", result) where result has the same
+        shape as answer_question's return value.
+        """
+        relevant_docs, prompt, prompt_tokens, company_name = self._build_prompt(
+            question, collection_name, filters
+        )
+        if not relevant_docs:
+            yield "done", self._no_context_result()
+            return
+
+        sources = self._format_sources(relevant_docs)
+        yield "sources", {"sources": sources, "company": company_name, "prompt_tokens": prompt_tokens}
+
+        if not self.llm:
+            yield "done", self._llm_unavailable_result(relevant_docs, prompt_tokens)
+            return
+
+        parts = []
+        generation_failed = False
+        with self.llm_limiter.slot():
+            try:
+                for text in self._stream_tokens(prompt):
+                    parts.append(text)
+                    yield "token", text
+            except Exception as llm_error:
+                logger.error(f"LLM streaming error: {llm_error}")
+                parts = [f"Error generating response: {str(llm_error)}"]
+                generation_failed = True
+
+        yield "done", {
+            "answer": "".join(parts),
+            "sources": sources,
+            "context_found": True,
+            "company": company_name,
+            "prompt_tokens": prompt_tokens,
+            "llm_error": generation_failed
+        }
+
     def _format_sources(self, relevant_docs):
         """Format sources for API response"""
         sources = []
@@ -327,10 +547,15 @@ Context: {context}
         
         return sources
 
-    def analyze_company(self, question, company_name):
+    def analyze_company(self, question, company_name, filters=None):
         """Convenience wrapper"""
         collection_name = f"company_{company_name.lower().replace(' ', '_').replace('.', '')}"
-        return self.answer_question(question, collection_name)
+        return self.answer_question(question, collection_name, filters=filters)
+
+    def analyze_company_stream(self, question, company_name, filters=None):
+        """Streaming counterpart of analyze_company"""
+        collection_name = f"company_{company_name.lower().replace(' ', '_').replace('.', '')}"
+        return self.stream_answer(question, collection_name, filters=filters)
 
     def get_collection_info(self, company_name):
         """Get information about a company's collection"""
@@ -346,11 +571,24 @@ Context: {context}
             logger.error(f"Error getting collection info for {company_name}: {e}")
             return None
 
+    def delete_source_points(self, company_name, source_key, progress_callback=None):
+        """Delete the points of one Document/ScrapedURL from a company's collection"""
+        from .vector_store import delete_source_points
+
+        collection_name = f"company_{company_name.lower().replace(' ', '_').replace('.', '')}"
+        if not self.qdrant_client.collection_exists(collection_name):
+            logger.info(f"Collection {collection_name} does not exist, nothing to delete for {source_key}")
+            return 0
+        return delete_source_points(
+            self.qdrant_client, collection_name, source_key, progress_callback=progress_callback
+        )
+
     def delete_collection(self, company_name):
         """Delete a company's collection"""
         try:
             collection_name = f"company_{company_name.lower().replace(' ', '_').replace('.', '')}"
             self.qdrant_client.delete_collection(collection_name)
+            self._known_collections.pop(collection_name, None)
             logger.info(f"Deleted collection {collection_name}")
             return True
         except Exception as e:
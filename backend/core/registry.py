@@ -0,0 +1,312 @@
+"""
+Process-wide registry for the heavy RAG resources (embeddings, Qdrant, LLM and its tokenizer)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class RAGResourceRegistry:
+    """
+    Lazily builds the embedding model, Qdrant client and LLM client once per
+    process and hands the same instances to every caller.
+
+    Resources are rebuilt automatically when ``settings.RAG_SETTINGS`` changes.
+
+    The async clients used by the ASGI query path are bound to an event loop,
+    so they are cached per running loop instead.
+    """
+
+    RESOURCES = ('embeddings', 'qdrant_client', 'llm', 'tokenizer')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._resources = {}
+        self._async_resources = {}
+        self._processor = None
+        self._async_processor = None
+        self._fingerprint = None
+        self._metrics = {name: self._empty_metrics() for name in self.RESOURCES}
+        self._reload_count = 0
+
+    @staticmethod
+    def _empty_metrics():
+        return {
+            'loaded': False,
+            'load_count': 0,
+            'last_load_time_ms': None,
+            'total_load_time_ms': 0,
+            'loaded_at': None,
+            'last_error': None,
+        }
+
+    def _settings_fingerprint(self):
+        payload = json.dumps(settings.RAG_SETTINGS, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _check_settings(self):
+        """Drop cached resources if RAG_SETTINGS changed since they were built"""
+        fingerprint = self._settings_fingerprint()
+        if fingerprint == self._fingerprint:
+            return
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            if self._fingerprint is not None:
+                logger.info("RAG_SETTINGS changed, reloading RAG resources")
+                self._reload_count += 1
+            self._resources.clear()
+            self._async_resources.clear()
+            self._processor = None
+            self._async_processor = None
+            for name in self.RESOURCES:
+                self._metrics[name]['loaded'] = False
+            self._fingerprint = fingerprint
+
+    def _get(self, name, loader):
+        self._check_settings()
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+
+        with self._lock:
+            resource = self._resources.get(name)
+            if resource is not None:
+                return resource
+
+            metrics = self._metrics[name]
+            start_time = time.perf_counter()
+            try:
+                resource = loader(settings.RAG_SETTINGS)
+            except Exception as e:
+                metrics['last_error'] = str(e)
+                logger.error(f"Failed to load RAG resource {name}: {e}")
+                raise
+
+            elapsed_ms = int((time.perf_counter() - start_time) * 1000)
+            metrics.update({
+                'loaded': True,
+                'load_count': metrics['load_count'] + 1,
+                'last_load_time_ms': elapsed_ms,
+                'total_load_time_ms': metrics['total_load_time_ms'] + elapsed_ms,
+                'loaded_at': timezone.now().isoformat(),
+                'last_error': None,
+            })
+            self._resources[name] = resource
+            logger.info(f"Loaded RAG resource {name} in {elapsed_ms}ms")
+            return resource
+
+    def _get_async(self, name, loader):
+        self._check_settings()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            per_loop = self._async_resources.setdefault(name, weakref.WeakKeyDictionary())
+            resource = per_loop.get(loop)
+            if resource is None:
+                resource = per_loop[loop] = loader(settings.RAG_SETTINGS)
+                logger.info(f"Created async RAG resource {name}")
+            return resource
+
+    # Loaders
+
+    @staticmethod
+    def _load_embeddings(rag_settings):
+        if rag_settings.get('EMBEDDING_BACKEND', 'torch') == 'onnx':
+            from .onnx_embeddings import OnnxEmbeddings
+
+            return OnnxEmbeddings(
+                model_path=rag_settings['ONNX_MODEL_PATH'],
+                model_file=rag_settings.get('ONNX_MODEL_FILE', 'model_quantized.onnx'),
+                model_name=rag_settings['EMBEDDING_MODEL'],
+                pooling=rag_settings.get('EMBEDDING_POOLING', 'cls'),
+                batch_size=rag_settings.get('EMBEDDING_BATCH_SIZE', 32),
+                num_threads=rag_settings.get('ONNX_NUM_THREADS', 0)
+            )
+
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(
+            model_name=rag_settings['EMBEDDING_MODEL'],
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True}
+        )
+
+    @staticmethod
+    def _load_qdrant_client(rag_settings):
+        import httpx
+        from qdrant_client import QdrantClient
+
+        pool_size = rag_settings.get('QDRANT_POOL_SIZE', 10)
+        return QdrantClient(
+            host=rag_settings['QDRANT_HOST'],
+            port=rag_settings['QDRANT_PORT'],
+            grpc_port=rag_settings.get('QDRANT_GRPC_PORT', 6334),
+            prefer_grpc=rag_settings.get('QDRANT_PREFER_GRPC', False),
+            timeout=rag_settings.get('QDRANT_TIMEOUT', 30),
+            # Keep-alive connection pool shared by all threads of this process (REST only)
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    @staticmethod
+    def _load_llm(rag_settings):
+        model_name = rag_settings['LLM_MODEL']
+        try:
+            from langchain_community.llms import Ollama
+            llm = Ollama(
+                model=model_name,
+                base_url=rag_settings.get('OLLAMA_BASE_URL', 'http://localhost:11434'),
+                temperature=0.1,
+                timeout=rag_settings.get('OLLAMA_TIMEOUT', 120)
+            )
+            logger.info(f"Using Ollama with {model_name}")
+            return llm
+        except Exception as e:
+            logger.error(f'Could not load LLM model {model_name}: {e}')
+            return False
+
+    @staticmethod
+    def _load_tokenizer(rag_settings):
+        tokenizer_name = rag_settings.get('CONTEXT_TOKENIZER')
+        if not tokenizer_name:
+            return False
+        try:
+            from transformers import AutoTokenizer
+            return AutoTokenizer.from_pretrained(tokenizer_name)
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer {tokenizer_name}, estimating token counts: {e}")
+            return False
+
+    @staticmethod
+    def _load_async_qdrant_client(rag_settings):
+        import httpx
+        from qdrant_client import AsyncQdrantClient
+
+        pool_size = rag_settings.get('QDRANT_POOL_SIZE', 10)
+        return AsyncQdrantClient(
+            host=rag_settings['QDRANT_HOST'],
+            port=rag_settings['QDRANT_PORT'],
+            grpc_port=rag_settings.get('QDRANT_GRPC_PORT', 6334),
+            prefer_grpc=rag_settings.get('QDRANT_PREFER_GRPC', False),
+            timeout=rag_settings.get('QDRANT_TIMEOUT', 30),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    @staticmethod
+    def _load_async_llm(rag_settings):
+        from .ollama import AsyncOllamaClient
+
+        return AsyncOllamaClient(
+            base_url=rag_settings.get('OLLAMA_BASE_URL', 'http://localhost:11434'),
+            model=rag_settings['LLM_MODEL'],
+            timeout=rag_settings.get('OLLAMA_TIMEOUT', 120),
+            pool_size=rag_settings.get('OLLAMA_POOL_SIZE', 100)
+        )
+
+    # Public API
+
+    def get_embeddings(self):
+        return self._get('embeddings', self._load_embeddings)
+
+    def get_qdrant_client(self):
+        return self._get('qdrant_client', self._load_qdrant_client)
+
+    def get_llm(self):
+        # A failed LLM load is cached as False so we don't retry on every request
+        return self._get('llm', self._load_llm) or None
+
+    def get_tokenizer(self):
+        # Cached as False when unavailable; callers fall back to estimates
+        return self._get('tokenizer', self._load_tokenizer) or None
+
+    def get_processor(self):
+        """Return the shared DjangoFinancialRAGProcessor for this process"""
+        self._check_settings()
+        processor = self._processor
+        if processor is not None:
+            return processor
+
+        with self._lock:
+            if self._processor is None:
+                from .rag_processor import DjangoFinancialRAGProcessor
+                self._processor = DjangoFinancialRAGProcessor(registry=self)
+            return self._processor
+
+    def get_async_qdrant_client(self):
+        """AsyncQdrantClient for the running event loop"""
+        return self._get_async('async_qdrant_client', self._load_async_qdrant_client)
+
+    def get_async_llm(self):
+        """AsyncOllamaClient for the running event loop"""
+        return self._get_async('async_llm', self._load_async_llm)
+
+    def get_async_processor(self):
+        """Return the shared AsyncRAGProcessor, built on top of the sync processor"""
+        processor = self.get_processor()
+        with self._lock:
+            if self._async_processor is None or self._async_processor.processor is not processor:
+                from .async_processor import AsyncRAGProcessor
+                self._async_processor = AsyncRAGProcessor(processor, registry=self)
+            return self._async_processor
+
+    def warm_up(self, embeddings=True, qdrant=True, llm=True):
+        """Eagerly load resources, e.g. at worker start instead of on the first request"""
+        if embeddings:
+            model = self.get_embeddings()
+            start_time = time.perf_counter()
+            model.embed_query("warm up")
+            logger.info(f"Embedding warm-up encode took {int((time.perf_counter() - start_time) * 1000)}ms")
+        if qdrant:
+            self.get_qdrant_client()
+        if llm:
+            self.get_llm()
+        return self.metrics()
+
+    def reset_after_fork(self, keep=('embeddings',)):
+        """
+        Called in forked children: keep the fork-shared model weights but drop
+        clients holding sockets/locks inherited from the parent.
+        """
+        self._lock = threading.RLock()
+        for name in self.RESOURCES:
+            if name not in keep:
+                self._resources.pop(name, None)
+                self._metrics[name]['loaded'] = False
+        self._async_resources = {}
+        self._processor = None
+        self._async_processor = None
+
+    def reload(self):
+        """Force every resource to be rebuilt on next access"""
+        with self._lock:
+            self._fingerprint = None
+            self._check_settings()
+            self._reload_count += 1
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'resources': {name: dict(values) for name, values in self._metrics.items()},
+                'reload_count': self._reload_count,
+            }
+
+
+rag_registry = RAGResourceRegistry()
+
+
+def get_rag_processor():
+    """Shortcut used by views and tasks"""
+    return rag_registry.get_processor()
+
+
+def get_async_rag_processor():
+    """Shortcut for the async query path (call through sync_to_async, the first call loads models)"""
+    return rag_registry.get_async_processor()
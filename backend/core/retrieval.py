@@ -0,0 +1,176 @@
+"""
+Hybrid retrieval: dense (embedding) and sparse (BM25-style lexical) searches
+over a company collection, fused with reciprocal rank fusion
+
+Sparse vectors use hashed tokens with saturated term frequencies as values;
+Qdrant applies the IDF part of BM25 at query time (Modifier.IDF), so the index
+needs no corpus statistics of its own.
+"""
+import asyncio
+import logging
+import re
+import zlib
+from collections import Counter
+
+from langchain_core.documents import Document
+from qdrant_client.http import models as qdrant_models
+
+from .vector_store import SPARSE_VECTOR_NAME, search_params
+
+logger = logging.getLogger(__name__)
+
+# BM25 term frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Roughly the token count of a CHUNK_SIZE=1000 chunk
+BM25_AVG_DOC_LENGTH = 150
+
+_THOUSANDS_SEPARATOR_RE = re.compile(r'(?<=\d),(?=\d{3}\b)')
+_TOKEN_RE = re.compile(r'[a-z0-9]+(?:\.[0-9]+)?')
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the their this
+to was were what which will with how did does do about into than then there these they
+""".split())
+
+
+def tokenize(text):
+    """Lowercased word/number tokens; keeps terms like "fy2023", "ebitda" and "4200.5" whole"""
+    text = _THOUSANDS_SEPARATOR_RE.sub('', text.lower())
+    return [token for token in _TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+
+def token_index(token):
+    # Stable across processes, unlike hash()
+    return zlib.crc32(token.encode('utf-8'))
+
+
+def sparse_vector(text, query=False):
+    """
+    Sparse vector of ``text``. Documents get BM25 term weights; queries
+    weigh each distinct term 1.0 and leave the IDF to Qdrant.
+    """
+    counts = Counter(tokenize(text))
+    if not counts:
+        return qdrant_models.SparseVector(indices=[], values=[])
+
+    weights = {}
+    length_norm = 1 - BM25_B + BM25_B * sum(counts.values()) / BM25_AVG_DOC_LENGTH
+    for token, count in counts.items():
+        index = token_index(token)
+        weight = 1.0 if query else count * (BM25_K1 + 1) / (count + BM25_K1 * length_norm)
+        # Hash collisions merge into one dimension
+        weights[index] = weights.get(index, 0.0) + weight
+
+    indices = sorted(weights)
+    return qdrant_models.SparseVector(indices=indices, values=[weights[index] for index in indices])
+
+
+def reciprocal_rank_fusion(result_lists, k=60, limit=None):
+    """
+    Merge ranked lists of Qdrant points: each point scores sum(1 / (k + rank))
+    over the lists it appears in. Returns points, best first.
+    """
+    scores = {}
+    points = {}
+    for results in result_lists:
+        for rank, point in enumerate(results, start=1):
+            scores[point.id] = scores.get(point.id, 0.0) + 1.0 / (k + rank)
+            points.setdefault(point.id, point)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [points[point_id] for point_id in ranked]
+
+
+def point_document(point):
+    """Points use langchain's QdrantVectorStore payload layout"""
+    payload = point.payload or {}
+    return Document(page_content=payload.get('page_content', ''), metadata=payload.get('metadata') or {})
+
+
+class HybridRetriever:
+    """
+    Runs the dense search and, for collections with a sparse vector, the
+    lexical search, each for ``prefetch_k`` candidates, then keeps the top
+    ``k`` by reciprocal rank fusion.
+    """
+
+    def __init__(self, client, embeddings, rag_settings):
+        self.client = client
+        self.embeddings = embeddings
+        self.rag_settings = rag_settings
+        self.k = rag_settings.get('RETRIEVAL_K', 5)
+        self.prefetch_k = max(rag_settings.get('HYBRID_PREFETCH_K', 20), self.k)
+        self.rrf_k = rag_settings.get('RRF_K', 60)
+
+    def _dense_query(self, vector, collection_name, qdrant_filter, hybrid):
+        return dict(
+            collection_name=collection_name,
+            query=vector,
+            query_filter=qdrant_filter,
+            search_params=search_params(self.rag_settings),
+            limit=self.prefetch_k if hybrid else self.k,
+            with_payload=True
+        )
+
+    def _sparse_query(self, question, collection_name, qdrant_filter):
+        """query_points arguments of the lexical search, or None if the question has no terms"""
+        query_vector = sparse_vector(question, query=True)
+        if not query_vector.indices:
+            return None
+        return dict(
+            collection_name=collection_name,
+            query=query_vector,
+            using=SPARSE_VECTOR_NAME,
+            query_filter=qdrant_filter,
+            limit=self.prefetch_k,
+            with_payload=True
+        )
+
+    def _fuse(self, collection_name, dense_results, sparse_results):
+        fused = reciprocal_rank_fusion([dense_results, sparse_results], k=self.rrf_k, limit=self.k)
+        logger.info(
+            f"Hybrid retrieval on {collection_name}: {len(dense_results)} dense, "
+            f"{len(sparse_results)} sparse candidates, {len(fused)} fused"
+        )
+        return [point_document(point) for point in fused]
+
+    def retrieve(self, question, collection_name, qdrant_filter=None, hybrid=True):
+        vector = self.embeddings.embed_query(question)
+        dense_results = self.client.query_points(
+            **self._dense_query(vector, collection_name, qdrant_filter, hybrid)
+        ).points
+
+        if not hybrid:
+            return [point_document(point) for point in dense_results]
+
+        sparse_results = []
+        sparse_query = self._sparse_query(question, collection_name, qdrant_filter)
+        if sparse_query:
+            sparse_results = self.client.query_points(**sparse_query).points
+
+        return self._fuse(collection_name, dense_results, sparse_results)
+
+    async def aretrieve(self, async_client, question, collection_name, qdrant_filter=None, hybrid=True):
+        """
+        retrieve() for the async path: the query is embedded in a worker thread
+        and the dense and sparse searches run concurrently on ``async_client``
+        """
+        vector = await asyncio.to_thread(self.embeddings.embed_query, question)
+        dense_search = async_client.query_points(
+            **self._dense_query(vector, collection_name, qdrant_filter, hybrid)
+        )
+
+        if not hybrid:
+            return [point_document(point) for point in (await dense_search).points]
+
+        sparse_query = self._sparse_query(question, collection_name, qdrant_filter)
+        if not sparse_query:
+            return self._fuse(collection_name, (await dense_search).points, [])
+
+        dense_response, sparse_response = await asyncio.gather(
+            dense_search, async_client.query_points(**sparse_query)
+        )
+        return self._fuse(collection_name, dense_response.points, sparse_response.points)
@@ -0,0 +1,57 @@
+"""
+Startup import budget: how long `manage.py check` takes in a fresh
+interpreter and which ingestion/ML dependencies it imports
+"""
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+# None of these may be imported just to boot Django
+HEAVY_MODULES = (
+    'torch', 'transformers', 'sentence_transformers', 'pdfplumber', 'pandas',
+    'newspaper', 'bs4', 'langchain', 'langchain_community', 'langchain_core',
+    'langchain_huggingface', 'langchain_qdrant', 'langchain_text_splitters',
+    'qdrant_client',
+)
+
+
+def imported_heavy_modules(importtime_output):
+    """Top-level HEAVY_MODULES found in `python -X importtime` output"""
+    imported = set()
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        module = line.rsplit('|', 1)[-1].strip()
+        top_level = module.split('.')[0]
+        if top_level in HEAVY_MODULES:
+            imported.add(top_level)
+    return imported
+
+
+def measure_startup(runs=3):
+    """
+    Run `manage.py check` ``runs`` times; returns the fastest wall time in ms
+    and the heavy modules imported by any run. Raises RuntimeError if the
+    check fails.
+    """
+    manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+    timings = []
+    heavy_imports = set()
+
+    for _ in range(max(runs, 1)):
+        start_time = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', manage_py, 'check'],
+            capture_output=True, text=True, cwd=settings.BASE_DIR
+        )
+        timings.append(int((time.perf_counter() - start_time) * 1000))
+
+        if result.returncode != 0:
+            raise RuntimeError(f"`manage.py check` failed:\n{result.stdout}{result.stderr}")
+
+        heavy_imports |= imported_heavy_modules(result.stderr)
+
+    return min(timings), heavy_imports
@@ -0,0 +1,54 @@
+"""
+Per-user cache for the dashboard stats endpoints
+
+Entries are keyed by a per-user version number. Saving or deleting a document,
+URL or query bumps the owner's version (see the apps' signals), so the next
+request recomputes the stats instead of serving stale counts.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(user_id):
+    return f"stats:user:{user_id}:version"
+
+
+def get_stats_version(user_id):
+    return cache.get_or_set(_version_key(user_id), 0, timeout=None)
+
+
+def invalidate_stats(user_id):
+    """Make every cached stats entry of ``user_id`` stale"""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # No version yet, so nothing cached either
+        pass
+    except Exception as e:
+        logger.warning(f"Could not invalidate stats of user {user_id}: {e}")
+
+
+def cached_stats(user_id, name, compute):
+    """Return the stats called ``name`` for ``user_id``, calling ``compute()`` on a miss"""
+    timeout = settings.RAG_SETTINGS.get('STATS_CACHE_TTL', 300)
+    if not timeout:
+        return compute()
+
+    try:
+        key = f"stats:user:{user_id}:v{get_stats_version(user_id)}:{name}"
+        stats = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Stats cache unavailable, computing {name} stats: {e}")
+        return compute()
+
+    if stats is None:
+        stats = compute()
+        try:
+            cache.set(key, stats, timeout)
+        except Exception as e:
+            logger.warning(f"Could not cache {name} stats: {e}")
+    return stats
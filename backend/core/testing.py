@@ -0,0 +1,179 @@
+"""
+Sample data and request helpers for the tests and the benchmark commands
+"""
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test.utils import override_settings
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Outside the test runner: run the block in a transaction that is always
+    rolled back, accepting test client requests
+    """
+    try:
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            yield
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+def api_client(user):
+    """An APIClient authenticated as ``user``"""
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def make_pdf(pages, lines_per_page=40):
+    """A text-only PDF with ``pages`` pages, written without a PDF library"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    page_ids = []
+    for page in range(1, pages + 1):
+        lines = [
+            f"({page}.{i} Revenue grew to {4200 + page * 10 + i} million on higher volumes in segment {i}) Tj T*"
+            for i in range(lines_per_page)
+        ]
+        stream = ("BT /F1 9 Tf 11 TL 40 770 Td " + " ".join(lines) + " ET").encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % len(objects)
+        )
+        page_ids.append(len(objects))
+    kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, pages)
+
+    pdf = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+# Financial sentences for comparing embedding backends
+SAMPLE_TEXTS = [
+    "Total revenue increased 12% year over year to $4.2 billion, driven by services growth.",
+    "Net liabilities at the end of fiscal 2023 were $1.8 billion compared with $2.1 billion a year earlier.",
+    "EBITDA margin contracted by 150 basis points due to higher input costs and wage inflation.",
+    "The company repurchased 3.5 million shares for an aggregate of $420 million during the quarter.",
+    "Operating cash flow was $910 million, partially offset by capital expenditures of $260 million.",
+    "Risk factors include foreign exchange volatility, supply chain disruption and regulatory changes.",
+    "Financial Table (Page 42):\nItem  FY2023  FY2022\nRevenue  4,200  3,750\nCost of sales  2,310  2,010",
+    "Goodwill impairment of $75 million was recognized in the European segment in the fourth quarter.",
+    "Diluted earnings per share were $2.31 versus $1.97 in the prior year period.",
+    "The board declared a quarterly dividend of $0.24 per share, payable on March 15.",
+]
+
+
+# Lowest per-sentence cosine similarity at which the ONNX backend counts as
+# matching the torch one
+PARITY_MIN_COSINE = 0.98
+
+
+def cosine(a, b):
+    """Cosine similarity of two vectors given as lists"""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(y * y for y in b) ** 0.5
+    return dot / (norm_a * norm_b) if norm_a and norm_b else 0.0
+
+
+def create_documents(company, user, count, tables=2, table_rows=1, **fields):
+    """Create ``count`` documents of ``company``, each with ``tables`` extracted tables"""
+    from documents.models import Document, ExtractedTable
+
+    headers = ['Item', 'FY2023', 'FY2022', 'FY2021', 'Change', 'Notes']
+    rows = [
+        [f"Line item {i}", '4,200.5', '3,750.0', '3,410.2', '12.0%', 'Restated for discontinued operations']
+        for i in range(table_rows)
+    ]
+    documents = Document.objects.bulk_create([
+        Document(
+            company=company, uploaded_by=user, file=f"documents/sample-{i}.pdf",
+            original_filename=f"sample-{i}.pdf", file_size=1024, file_type='application/pdf', **fields
+        )
+        for i in range(count)
+    ])
+    ExtractedTable.objects.bulk_create(
+        [
+            ExtractedTable(document=document, page_number=i + 1, table_index=0, headers=headers, data=rows)
+            for document in documents for i in range(tables)
+        ],
+        batch_size=500
+    )
+    return documents
+
+
+def create_sample_data(rows, username='sample-data'):
+    """
+    Create a user owning ``rows`` companies and, on the first company, ``rows``
+    documents (two tables each), URLs and queries (two sources each)
+    """
+    from companies.models import Company
+    from documents.models import ScrapedURL
+    from queries.models import Query, QuerySource
+
+    user = User.objects.create(username=username)
+    companies = [
+        Company.objects.create(name=f"{username} {i}", created_by=user)
+        for i in range(rows)
+    ]
+    company = companies[0]
+    documents = create_documents(company, user, rows)
+    urls = ScrapedURL.objects.bulk_create([
+        ScrapedURL(company=company, added_by=user, url=f"https://example.com/{i}", source_domain='example.com')
+        for i in range(rows)
+    ])
+    queries = Query.objects.bulk_create([
+        Query(company=company, user=user, question='What was the revenue?', answer='-')
+        for _ in range(rows)
+    ])
+    QuerySource.objects.bulk_create([
+        QuerySource(query=query, source_type='news', source_name='example.com', content_snippet='-')
+        for query in queries for _ in range(2)
+    ])
+    return SimpleNamespace(
+        user=user, company=company, companies=companies, documents=documents, urls=urls, queries=queries
+    )
+
+
+class QueryBudgetMixin:
+    """
+    For TestCases: sample data of one user with a single row of each kind and
+    of one with many, to check an endpoint's query count doesn't grow with the
+    number of rows (N+1)
+    """
+
+    rows = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.one_row = create_sample_data(1, username='one-row')
+        cls.many_rows = create_sample_data(cls.rows, username='many-rows')
+
+    def assertQueryBudget(self, queries, path):
+        """GET ``path(sample_data)`` for both users, running exactly ``queries`` queries"""
+        for data in (self.one_row, self.many_rows):
+            with self.subTest(rows=len(data.documents)):
+                client = api_client(data.user)
+                with self.assertNumQueries(queries):
+                    response = client.get(path(data))
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,176 @@
+import gc
+import importlib.util
+import os
+import tempfile
+import tracemalloc
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from .startup import imported_heavy_modules, measure_startup
+from .testing import PARITY_MIN_COSINE, SAMPLE_TEXTS, cosine, make_pdf
+
+
+class StartupImportTests(SimpleTestCase):
+    """`manage.py check` must stay fast and must not import ingestion/ML dependencies"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.best_ms, cls.heavy_imports = measure_startup(runs=3)
+
+    def test_no_heavy_imports(self):
+        self.assertEqual(self.heavy_imports, set())
+
+    def test_within_budget(self):
+        self.assertLessEqual(self.best_ms, settings.STARTUP_IMPORT_BUDGET_MS)
+
+    def test_heavy_imports_are_detected(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   django.conf\n"
+            "import time:      3400 |      91000 | torch._C\n"
+            "import time:       800 |       2300 |     pdfplumber\n"
+        )
+        self.assertEqual(imported_heavy_modules(output), {'torch', 'pdfplumber'})
+
+
+class IterPdfPagesMemoryTests(SimpleTestCase):
+    """iter_pdf_pages must not hold on to pages it has finished"""
+
+    def peak_memory(self, pages):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        from . import ingestion
+
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf_file:
+            pdf_file.write(make_pdf(pages, lines_per_page=10))
+            pdf_file.flush()
+
+            # In a worker with a large heap full collections are rare; only
+            # the ones iter_pages runs itself count here
+            gc.collect()
+            gc.disable()
+            tracemalloc.start()
+            try:
+                page_count = 0
+                for _, page_count, _, _ in ingestion.iter_pdf_pages(pdf_file.name, splitter):
+                    pass
+                self.assertEqual(page_count, pages)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                gc.enable()
+
+    @mock.patch('core.ingestion.PDF_GC_INTERVAL_PAGES', 10)
+    def test_peak_memory_does_not_grow_with_page_count(self):
+        # Warm up lazy imports and module-level caches
+        self.peak_memory(pages=2)
+
+        short = self.peak_memory(pages=15)
+        long = self.peak_memory(pages=60)
+
+        # A page kept until the end costs several KiB, so 45 more pages
+        # would add a few hundred
+        self.assertLess(long - short, 64 * 1024)
+
+
+def onnx_model_available():
+    rag_settings = settings.RAG_SETTINGS
+    model_file = os.path.join(rag_settings['ONNX_MODEL_PATH'], rag_settings['ONNX_MODEL_FILE'])
+    return os.path.isfile(model_file) and all(
+        importlib.util.find_spec(module) for module in ('onnxruntime', 'sentence_transformers')
+    )
+
+
+@unittest.skipUnless(onnx_model_available(), "ONNX model not exported (see export_onnx_embeddings)")
+class OnnxParityTests(SimpleTestCase):
+    """The ONNX backend must embed like the torch backend it was exported from"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from .registry import RAGResourceRegistry
+
+        cls.vectors = {
+            backend: RAGResourceRegistry._load_embeddings(
+                dict(settings.RAG_SETTINGS, EMBEDDING_BACKEND=backend)
+            ).embed_documents(SAMPLE_TEXTS)
+            for backend in ('torch', 'onnx')
+        }
+
+    def test_documents_match_torch(self):
+        for text, torch_vector, onnx_vector in zip(SAMPLE_TEXTS, self.vectors['torch'], self.vectors['onnx']):
+            with self.subTest(text=text[:40]):
+                self.assertEqual(len(onnx_vector), len(torch_vector))
+                self.assertGreaterEqual(cosine(torch_vector, onnx_vector), PARITY_MIN_COSINE)
+
+    def test_vectors_are_normalized(self):
+        for vector in self.vectors['onnx']:
+            self.assertAlmostEqual(sum(x * x for x in vector), 1.0, places=3)
+
+
+class FakeSentenceTransformer:
+    """Records how texts are encoded: in-process or on a multi-process pool"""
+
+    def __init__(self):
+        self.pools_started = 0
+        self.pool_texts = 0
+
+    def encode(self, texts, **kwargs):
+        import numpy as np
+
+        return np.array([[len(text), 1.0] for text in texts])
+
+    def start_multi_process_pool(self, target_devices):
+        self.pools_started += 1
+        return {'processes': target_devices}
+
+    def stop_multi_process_pool(self, pool):
+        pass
+
+    def encode_multi_process(self, texts, pool, batch_size=32):
+        self.pool_texts += len(texts)
+        return self.encode(texts)
+
+
+class EmbeddingEngineProcessPoolTests(SimpleTestCase):
+    """EMBEDDING_PROCESSES in prefork Celery children, which are daemonic"""
+
+    def setUp(self):
+        from .embedding_engine import EmbeddingEngine
+
+        self.client = FakeSentenceTransformer()
+        embeddings = SimpleNamespace(_client=self.client, encode_kwargs={})
+        self.engine = EmbeddingEngine(embeddings, batch_size=4, processes=2)
+        self.texts = [f"Revenue line {i}" for i in range(20)]
+
+    def in_process(self, daemon):
+        current_process = SimpleNamespace(daemon=daemon, name='ForkPoolWorker-1')
+        return mock.patch('core.embedding_engine.multiprocessing.current_process', return_value=current_process)
+
+    def test_pool_is_used_in_a_regular_process(self):
+        with self.in_process(daemon=False):
+            self.assertEqual(self.engine.pool_batch_size, 8)
+            vectors = self.engine.embed_documents(self.texts)
+
+        self.assertEqual(self.client.pools_started, 1)
+        self.assertEqual(self.client.pool_texts, 20)
+        self.assertEqual(self.engine.last_stats['processes'], 2)
+        self.assertEqual(vectors[12], [len(self.texts[12]), 1.0])
+
+    def test_daemonic_process_falls_back_to_in_process_encoding(self):
+        with self.in_process(daemon=True), self.assertLogs('core.embedding_engine', 'INFO') as logs:
+            # Ingestion batches keep INGEST_BATCH_SIZE instead of growing for the pool
+            self.assertEqual(self.engine.pool_batch_size, 0)
+            vectors = self.engine.embed_documents(self.texts)
+
+        self.assertEqual(self.client.pools_started, 0)
+        self.assertEqual(self.client.pool_texts, 0)
+        self.assertEqual(self.engine.last_stats['processes'], 1)
+        self.assertEqual(vectors[12], [len(self.texts[12]), 1.0])
+        self.assertIn('daemonic process ForkPoolWorker-1', logs.output[0])
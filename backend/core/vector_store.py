@@ -0,0 +1,388 @@
+"""
+Qdrant helpers: payload indexes and search filters, plus the write path
+(batched, bounded-parallel upserts with retries)
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from qdrant_client.http import models as qdrant_models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Payload fields searches can be filtered on, with their index type
+PAYLOAD_INDEXES = {
+    'metadata.type': qdrant_models.PayloadSchemaType.KEYWORD,
+    'metadata.source': qdrant_models.PayloadSchemaType.KEYWORD,
+    'metadata.source_key': qdrant_models.PayloadSchemaType.KEYWORD,
+    'metadata.date': qdrant_models.PayloadSchemaType.DATETIME,
+}
+
+# Named sparse vector holding the lexical (BM25) index, see core.retrieval
+SPARSE_VECTOR_NAME = 'text-sparse'
+
+# Namespace for deterministic point ids (uuid5)
+POINT_ID_NAMESPACE = uuid.UUID('6f1c2b0e-54a4-4c8e-9d0b-7a39f2f1a6d5')
+
+
+def chunk_point_id(source_key, metadata):
+    """
+    Stable point id for a chunk: the same source, page and chunk offset always
+    map to the same id, so re-ingesting a source overwrites instead of
+    duplicating. The id is keyed by source rather than content, so two
+    documents with identical files keep separate points.
+    """
+    if metadata.get('type') == 'financial_table':
+        offset = f"table-{metadata.get('table_index', 0)}"
+    else:
+        offset = f"chunk-{metadata.get('chunk_index', 0)}"
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{source_key}:{metadata.get('page', 0)}:{offset}"))
+
+
+def collection_tuning(rag_settings):
+    """HNSW and quantization config for the tuning in RAG_SETTINGS"""
+    hnsw_config = qdrant_models.HnswConfigDiff(
+        m=rag_settings.get('QDRANT_HNSW_M', 16),
+        ef_construct=rag_settings.get('QDRANT_HNSW_EF_CONSTRUCT', 100)
+    )
+    quantization_config = None
+    if rag_settings.get('QDRANT_QUANTIZATION') == 'int8':
+        quantization_config = qdrant_models.ScalarQuantization(
+            scalar=qdrant_models.ScalarQuantizationConfig(
+                type=qdrant_models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=rag_settings.get('QDRANT_QUANTIZATION_ALWAYS_RAM', True)
+            )
+        )
+    return hnsw_config, quantization_config
+
+
+def create_collection(client, collection_name, vector_size, rag_settings):
+    """Create a company collection with the configured HNSW, storage and quantization settings"""
+    hnsw_config, quantization_config = collection_tuning(rag_settings)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=qdrant_models.VectorParams(
+            size=vector_size,
+            distance=qdrant_models.Distance.COSINE,
+            on_disk=rag_settings.get('QDRANT_ON_DISK_VECTORS', False)
+        ),
+        sparse_vectors_config=(
+            {SPARSE_VECTOR_NAME: qdrant_models.SparseVectorParams(modifier=qdrant_models.Modifier.IDF)}
+            if rag_settings.get('HYBRID_SEARCH_ENABLED', True) else None
+        ),
+        hnsw_config=hnsw_config,
+        quantization_config=quantization_config
+    )
+
+
+def has_sparse_vectors(collection_info):
+    """Collections created before hybrid search only have the dense vector"""
+    return SPARSE_VECTOR_NAME in (collection_info.config.params.sparse_vectors or {})
+
+
+def apply_collection_settings(client, collection_name, rag_settings, dry_run=False):
+    """
+    Bring an existing collection in line with the configured tuning.
+    Only differing parts are updated, since Qdrant rebuilds the index for
+    each change. Returns the names of the changed settings.
+    """
+    collection_config = client.get_collection(collection_name).config
+    hnsw_config, quantization_config = collection_tuning(rag_settings)
+    changes = {}
+
+    current_hnsw = collection_config.hnsw_config
+    if (current_hnsw.m, current_hnsw.ef_construct) != (hnsw_config.m, hnsw_config.ef_construct):
+        changes['hnsw_config'] = hnsw_config
+
+    on_disk = rag_settings.get('QDRANT_ON_DISK_VECTORS', False)
+    vectors = collection_config.params.vectors
+    vectors = vectors if isinstance(vectors, dict) else {'': vectors}
+    vectors_config = {
+        name: qdrant_models.VectorParamsDiff(on_disk=on_disk)
+        for name, params in vectors.items()
+        if bool(params.on_disk) != on_disk
+    }
+    if vectors_config:
+        changes['vectors_config'] = vectors_config
+
+    current_quantization = collection_config.quantization_config
+    if quantization_config is None:
+        if current_quantization is not None:
+            changes['quantization_config'] = qdrant_models.Disabled.DISABLED
+    elif (not isinstance(current_quantization, qdrant_models.ScalarQuantization)
+          or current_quantization.scalar.always_ram != quantization_config.scalar.always_ram):
+        changes['quantization_config'] = quantization_config
+
+    if changes and not dry_run:
+        client.update_collection(collection_name=collection_name, **changes)
+        logger.info(f"Updated {', '.join(changes)} of collection {collection_name}")
+    return list(changes)
+
+
+def search_params(rag_settings):
+    """Query-time HNSW ef and quantization rescoring, or None for server defaults"""
+    hnsw_ef = rag_settings.get('QDRANT_HNSW_EF') or None
+    quantization = None
+    if rag_settings.get('QDRANT_QUANTIZATION') == 'int8':
+        quantization = qdrant_models.QuantizationSearchParams(
+            rescore=rag_settings.get('QDRANT_QUANTIZATION_RESCORE', True),
+            oversampling=rag_settings.get('QDRANT_QUANTIZATION_OVERSAMPLING', 2.0)
+        )
+    if hnsw_ef is None and quantization is None:
+        return None
+    return qdrant_models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+
+def ensure_payload_indexes(client, collection_name, payload_schema=None):
+    """Create whichever PAYLOAD_INDEXES the collection is missing"""
+    if payload_schema is None:
+        payload_schema = client.get_collection(collection_name).payload_schema or {}
+
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        if field_name in payload_schema:
+            continue
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+            wait=True
+        )
+        logger.info(f"Created {field_schema.value} payload index on {field_name} in {collection_name}")
+
+
+def search_filter(types=None, source_keys=None, date_from=None):
+    """
+    Qdrant filter for retrieval: chunk types, Document/ScrapedURL source keys
+    and an ISO ``date_from`` (only dated chunks, i.e. news, can match).
+    Returns None when nothing is filtered.
+    """
+    conditions = []
+    if types:
+        conditions.append(qdrant_models.FieldCondition(
+            key='metadata.type', match=qdrant_models.MatchAny(any=list(types))
+        ))
+    if source_keys:
+        conditions.append(qdrant_models.FieldCondition(
+            key='metadata.source_key', match=qdrant_models.MatchAny(any=list(source_keys))
+        ))
+    if date_from:
+        conditions.append(qdrant_models.FieldCondition(
+            key='metadata.date', range=qdrant_models.DatetimeRange(gte=date_from)
+        ))
+    return qdrant_models.Filter(must=conditions) if conditions else None
+
+
+def source_filter(source_key):
+    """Points written for one Document/ScrapedURL, see chunk tagging in add_to_knowledge_base"""
+    return qdrant_models.Filter(must=[qdrant_models.FieldCondition(
+        key='metadata.source_key', match=qdrant_models.MatchValue(value=source_key)
+    )])
+
+
+def delete_stale_points(client, collection_name, source_key, ingest_run):
+    """Delete points of ``source_key`` that weren't written by ``ingest_run``"""
+    stale = source_filter(source_key)
+    stale.must_not = [qdrant_models.FieldCondition(
+        key='metadata.ingest_run', match=qdrant_models.MatchValue(value=ingest_run)
+    )]
+    client.delete(
+        collection_name=collection_name,
+        points_selector=qdrant_models.FilterSelector(filter=stale),
+        wait=True
+    )
+
+
+def delete_source_points(client, collection_name, source_key, batch_size=1000, progress_callback=None):
+    """
+    Delete every point of ``source_key`` in batches, calling
+    ``progress_callback(deleted, total)`` after each batch. Returns the count.
+    """
+    points_filter = source_filter(source_key)
+    total = client.count(collection_name=collection_name, count_filter=points_filter, exact=True).count
+    deleted = 0
+    while True:
+        points, _ = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=points_filter,
+            limit=batch_size,
+            with_payload=False,
+            with_vectors=False
+        )
+        if not points:
+            break
+        client.delete(
+            collection_name=collection_name,
+            points_selector=qdrant_models.PointIdsList(points=[point.id for point in points]),
+            wait=True
+        )
+        deleted += len(points)
+        if progress_callback:
+            progress_callback(deleted, max(total, deleted))
+
+    logger.info(f"Deleted {deleted} points of {source_key} from {collection_name}")
+    return deleted
+
+
+def is_transient_error(exc):
+    """Errors worth retrying: timeouts, dropped connections, overload responses"""
+    if isinstance(exc, ResponseHandlingException):
+        return True
+    if isinstance(exc, UnexpectedResponse):
+        return exc.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import grpc
+    except ImportError:
+        return False
+    if isinstance(exc, grpc.RpcError):
+        return exc.code() in (
+            grpc.StatusCode.UNAVAILABLE,
+            grpc.StatusCode.DEADLINE_EXCEEDED,
+            grpc.StatusCode.RESOURCE_EXHAUSTED,
+        )
+    return False
+
+
+class UpsertMetrics:
+    """Process-wide upsert counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.points = 0
+        self.batches = 0
+        self.retries = 0
+        self.failures = 0
+        self.seconds = 0.0
+
+    def record(self, points=0, batches=0, retries=0, failures=0, seconds=0.0):
+        with self._lock:
+            self.points += points
+            self.batches += batches
+            self.retries += retries
+            self.failures += failures
+            self.seconds += seconds
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'points': self.points,
+                'batches': self.batches,
+                'retries': self.retries,
+                'failures': self.failures,
+                'points_per_sec': round(self.points / self.seconds, 1) if self.seconds else None,
+            }
+
+
+upsert_metrics = UpsertMetrics()
+
+
+class UpsertSession:
+    """
+    Buffers points for one collection and sends them in ``batch_size`` batches
+    on up to ``parallel`` threads, so network writes overlap with embedding.
+    ``add`` blocks once ``parallel * 2`` batches are in flight.
+
+    Use as a context manager; leaving the block waits for every batch and
+    re-raises the first failure.
+    """
+
+    def __init__(self, client, collection_name, batch_size=256, parallel=2,
+                 max_retries=3, backoff_seconds=0.5):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = max(int(batch_size), 1)
+        self.parallel = max(int(parallel), 1)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+        self._buffer = []
+        self._futures = []
+        self._slots = threading.BoundedSemaphore(self.parallel * 2)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.parallel, thread_name_prefix=f"upsert-{collection_name}"
+        )
+        self._lock = threading.Lock()
+        self._started_at = None
+        self.stats = {'points': 0, 'batches': 0, 'retries': 0, 'seconds': 0.0, 'points_per_sec': None}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for future in self._futures:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            return False
+        self.close()
+        return False
+
+    def add(self, points):
+        if self._started_at is None:
+            self._started_at = time.perf_counter()
+        self._buffer.extend(points)
+        while len(self._buffer) >= self.batch_size:
+            batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+            self._submit(batch)
+
+    def _submit(self, batch):
+        self._slots.acquire()
+        future = self._executor.submit(self._send, batch)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _send(self, batch):
+        attempt = 0
+        while True:
+            try:
+                self.client.upsert(collection_name=self.collection_name, points=batch, wait=True)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    upsert_metrics.record(failures=1)
+                    raise
+                attempt += 1
+                delay = self.backoff_seconds * (2 ** (attempt - 1)) * (1 + random.random())
+                logger.warning(
+                    f"Transient error upserting {len(batch)} points to {self.collection_name} "
+                    f"(attempt {attempt}/{self.max_retries}), retrying in {delay:.2f}s: {e}"
+                )
+                with self._lock:
+                    self.stats['retries'] += 1
+                upsert_metrics.record(retries=1)
+                time.sleep(delay)
+
+        with self._lock:
+            self.stats['points'] += len(batch)
+            self.stats['batches'] += 1
+
+    def close(self):
+        """Send the remaining points and wait for all batches"""
+        try:
+            if self._buffer:
+                batch, self._buffer = self._buffer, []
+                self._submit(batch)
+            for future in self._futures:
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        self.stats['seconds'] = round(elapsed, 3)
+        self.stats['points_per_sec'] = round(self.stats['points'] / elapsed, 1) if elapsed else None
+        upsert_metrics.record(points=self.stats['points'], batches=self.stats['batches'], seconds=elapsed)
+
+        if self.stats['points']:
+            logger.info(
+                f"Upserted {self.stats['points']} points to {self.collection_name} in "
+                f"{self.stats['batches']} batches ({self.stats['points_per_sec']} points/sec)"
+            )
+        return self.stats
@@ -3,8 +3,9 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 import logging
+from django.conf import settings
 
-from .rag_processor import DjangoFinancialRAGProcessor
+from .registry import rag_registry
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +24,20 @@ def health_check(request):
 def rag_status(request):
     """Check RAG pipeline status"""
     try:
-        processor = DjangoFinancialRAGProcessor()
+        processor = rag_registry.get_processor()
+        metrics = rag_registry.metrics()
+        if settings.RAG_SETTINGS.get('EMBEDDING_CACHE_ENABLED'):
+            from .embedding_cache import cache_stats
+            metrics['embedding_cache'] = cache_stats.as_dict()
+        from .vector_store import upsert_metrics
+        metrics['qdrant_upserts'] = upsert_metrics.as_dict()
+        metrics['llm_limiter'] = processor.llm_limiter.metrics()
         return Response({
             'status': 'operational',
             'qdrant_connected': True,
             'llm_available': processor.llm is not None,
-            'embedding_model': processor.embeddings.model_name if hasattr(processor.embeddings, 'model_name') else 'Unknown'
+            'embedding_model': processor.embeddings.model_name if hasattr(processor.embeddings, 'model_name') else 'Unknown',
+            'metrics': metrics
         })
     except Exception as e:
         logger.error(f"RAG status check failed: {e}")
@@ -7,14 +7,14 @@ class DocumentAdmin(admin.ModelAdmin):
     list_display = ['original_filename', 'company', 'status', 'file_size_mb', 'pages_count', 'created_at']
     list_filter = ['status', 'created_at', 'company']
     search_fields = ['original_filename', 'company__name']
-    readonly_fields = ['file_size', 'file_type', 'created_at', 'updated_at', 'file_size_mb']
+    readonly_fields = ['file_size', 'file_type', 'content_hash', 'created_at', 'updated_at', 'file_size_mb']
     
     fieldsets = (
         (None, {
             'fields': ('company', 'uploaded_by', 'file', 'original_filename')
         }),
         ('File Information', {
-            'fields': ('file_size', 'file_size_mb', 'file_type')
+            'fields': ('file_size', 'file_size_mb', 'file_type', 'content_hash')
         }),
         ('Processing', {
             'fields': ('status', 'processing_started_at', 'processing_completed_at', 'error_message')
@@ -20,6 +20,7 @@ class Document(models.Model):
     original_filename = models.CharField(max_length=255)
     file_size = models.BigIntegerField()
     file_type = models.CharField(max_length=50)
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)  # sha256 of the file
     
     # Processing information
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
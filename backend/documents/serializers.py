@@ -8,10 +8,41 @@ class ExtractedTableSerializer(serializers.ModelSerializer):
         fields = ['id', 'page_number', 'table_index', 'headers', 'data', 'created_at']
 
 
-class DocumentSerializer(serializers.ModelSerializer):
-    extracted_tables = ExtractedTableSerializer(many=True, read_only=True)
+def query_param_list(request, name):
+    """Comma-separated query parameter as a list, or None if absent"""
+    if request is None or name not in request.query_params:
+        return None
+    return [value.strip() for value in request.query_params[name].split(',') if value.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    `?fields=id,status` limits the response to the named fields and
+    `?expand=extracted_tables` adds fields listed in ``expandable_fields``
+    """
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+
+        for name in query_param_list(request, 'expand') or []:
+            if name in self.expandable_fields and name not in fields:
+                fields[name] = self.expandable_fields[name]()
+
+        requested = query_param_list(request, 'fields')
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+
+class DocumentSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Document without its tables' data, for list views"""
     file_size_mb = serializers.ReadOnlyField()
     company_name = serializers.CharField(source='company.name', read_only=True)
+    expandable_fields = {
+        'extracted_tables': lambda: ExtractedTableSerializer(many=True, read_only=True),
+    }
     
     class Meta:
         model = Document
@@ -19,8 +50,7 @@ class DocumentSerializer(serializers.ModelSerializer):
             'id', 'company', 'company_name', 'original_filename', 'file_size',
             'file_size_mb', 'file_type', 'status', 'processing_started_at',
             'processing_completed_at', 'pages_count', 'tables_count',
-            'chunks_created', 'created_at', 'updated_at', 'error_message',
-            'extracted_tables'
+            'chunks_created', 'created_at', 'updated_at', 'error_message'
         ]
         read_only_fields = [
             'id', 'file_size', 'file_type', 'status', 'processing_started_at',
@@ -29,6 +59,13 @@ class DocumentSerializer(serializers.ModelSerializer):
         ]
 
 
+class DocumentSerializer(DocumentSummarySerializer):
+    extracted_tables = ExtractedTableSerializer(many=True, read_only=True)
+    
+    class Meta(DocumentSummarySerializer.Meta):
+        fields = DocumentSummarySerializer.Meta.fields + ['extracted_tables']
+
+
 class DocumentUploadSerializer(serializers.ModelSerializer):
     file = serializers.FileField()
     
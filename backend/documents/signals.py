@@ -0,0 +1,61 @@
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Document, ScrapedURL
+from core.stats_cache import invalidate_stats
+
+_skip_point_deletion = ContextVar('skip_point_deletion', default=False)
+
+
+@contextmanager
+def skip_point_deletion():
+    """
+    Delete Documents/ScrapedURLs without queueing a point deletion per row,
+    for callers that drop the whole collection instead
+    """
+    token = _skip_point_deletion.set(True)
+    try:
+        yield
+    finally:
+        _skip_point_deletion.reset(token)
+
+
+def schedule_point_deletion(instance, source_key):
+    """
+    Queue removal of the instance's Qdrant points once the delete commits.
+    The task id is set on the instance so views can return it for progress polling.
+    """
+    if _skip_point_deletion.get():
+        return
+
+    from .tasks import delete_source_points_task
+
+    task_id = str(uuid.uuid4())
+    instance.point_deletion_task_id = task_id
+    args = [instance.company_id, instance.company.name, source_key]
+    transaction.on_commit(lambda: delete_source_points_task.apply_async(args=args, task_id=task_id))
+
+
+@receiver(post_delete, sender=Document)
+def delete_document_points(sender, instance, **kwargs):
+    schedule_point_deletion(instance, f"document:{instance.id}")
+
+
+@receiver(post_delete, sender=ScrapedURL)
+def delete_scraped_url_points(sender, instance, **kwargs):
+    schedule_point_deletion(instance, f"url:{instance.id}")
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+@receiver(post_save, sender=ScrapedURL)
+@receiver(post_delete, sender=ScrapedURL)
+def invalidate_owner_stats(sender, instance, **kwargs):
+    # After commit, so the stats aren't recomputed from uncommitted rows
+    user_id = instance.company.created_by_id
+    transaction.on_commit(lambda: invalidate_stats(user_id))
@@ -1,16 +1,29 @@
 import logging
 from celery import shared_task
 from celery_progress.backend import ProgressRecorder
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 
 from .models import Document, ExtractedTable, ScrapedURL
 from companies.models import Company
-from core.rag_processor import DjangoFinancialRAGProcessor
+from core.registry import get_rag_processor
 
 logger = logging.getLogger(__name__)
 
 
+def discard_deleted_source(processor, company_name, source_key):
+    """
+    Remove the points of a Document/ScrapedURL that was deleted while it was
+    being ingested; its own point deletion task may have run too early
+    """
+    try:
+        points_deleted = processor.delete_source_points(company_name, source_key)
+        logger.info(f"{source_key} was deleted during processing, removed {points_deleted} points")
+    except Exception as e:
+        logger.error(f"Error removing points of deleted {source_key}: {e}")
+
+
 @shared_task(bind=True)
 def process_document_task(self, document_id):
     """
@@ -27,41 +40,71 @@ def process_document_task(self, document_id):
         document.processing_started_at = timezone.now()
         document.save()
         
-        # Initialize RAG processor
-        processor = DjangoFinancialRAGProcessor()
+        # Shared RAG processor
+        processor = get_rag_processor()
         progress_recorder.set_progress(20, 100, description="Initializing RAG processor...")
         
-        # Process the PDF
+        def report_page(pages_done, page_count):
+            # Pages map onto the 20-80% range of the task
+            progress_recorder.set_progress(
+                20 + int(60 * pages_done / max(page_count, 1)), 100,
+                description=f"Processed page {pages_done} of {page_count}..."
+            )
+        
+        # Process the PDF page by page
+        source_key = f"document:{document.id}"
         result = processor.add_to_knowledge_base(
             content=document.file.path,
             content_type="pdf",
-            company_name=document.company.name
+            company_name=document.company.name,
+            progress_callback=report_page,
+            source_key=source_key,
+            source_exists=Document.objects.filter(id=document_id).exists
         )
+        if result.get('source_deleted'):
+            return {'status': 'deleted', 'source_key': source_key}
         progress_recorder.set_progress(80, 100, description="Adding to knowledge base...")
         
         # Update document with results
         with transaction.atomic():
+            # Saving a document deleted in the meantime would re-create it
+            if not Document.objects.select_for_update().filter(id=document_id).exists():
+                transaction.on_commit(
+                    lambda: discard_deleted_source(processor, document.company.name, source_key)
+                )
+                return {'status': 'deleted', 'source_key': source_key}
+            
             document.status = 'completed'
             document.processing_completed_at = timezone.now()
             document.chunks_created = result['chunks_added']
             document.tables_count = result['tables_extracted']
+            document.pages_count = result.get('pages_processed')
+            document.content_hash = result['content_key'].split(':', 1)[-1]
             document.save()
             
-            # Save extracted tables
-            for table_info in result.get('tables', []):
-                ExtractedTable.objects.create(
-                    document=document,
-                    page_number=table_info['page'],
-                    table_index=table_info['table_index'],
-                    headers=table_info['headers'],
-                    data=table_info['rows']
-                )
+            # Save extracted tables (replacing those of an earlier run)
+            document.extracted_tables.all().delete()
+            ExtractedTable.objects.bulk_create(
+                [
+                    ExtractedTable(
+                        document=document,
+                        page_number=table_info['page'],
+                        table_index=table_info['table_index'],
+                        headers=table_info['headers'],
+                        data=table_info['rows']
+                    )
+                    for table_info in result.get('tables', [])
+                ],
+                batch_size=settings.RAG_SETTINGS.get('DB_BULK_BATCH_SIZE', 500)
+            )
             
             # Update company counts
             company = document.company
             company.document_count = company.documents.filter(status='completed').count()
             company.last_processed_at = timezone.now()
-            company.save()
+            # Only the F() bump may write knowledge_version, this copy of it is stale
+            company.save(update_fields=['document_count', 'last_processed_at', 'updated_at'])
+            company.bump_knowledge_version()
         
         progress_recorder.set_progress(100, 100, description="PDF processing completed!")
         
@@ -70,7 +113,9 @@ def process_document_task(self, document_id):
             'status': 'success',
             'document_id': document_id,
             'chunks_added': result['chunks_added'],
-            'tables_extracted': result['tables_extracted']
+            'tables_extracted': result['tables_extracted'],
+            'embedding_stats': result.get('embedding_stats'),
+            'table_prescan': result.get('table_prescan')
         }
         
     except Document.DoesNotExist:
@@ -111,16 +156,21 @@ def process_url_task(self, scraped_url_id):
         scraped_url.processing_started_at = timezone.now()
         scraped_url.save()
         
-        # Initialize RAG processor
-        processor = DjangoFinancialRAGProcessor()
+        # Shared RAG processor
+        processor = get_rag_processor()
         progress_recorder.set_progress(30, 100, description="Initializing RAG processor...")
         
         # Process the URL
+        source_key = f"url:{scraped_url.id}"
         result = processor.add_to_knowledge_base(
             content=scraped_url.url,
             content_type="news",
-            company_name=scraped_url.company.name
+            company_name=scraped_url.company.name,
+            source_key=source_key,
+            source_exists=ScrapedURL.objects.filter(id=scraped_url_id).exists
         )
+        if result.get('source_deleted'):
+            return {'status': 'deleted', 'source_key': source_key}
         progress_recorder.set_progress(80, 100, description="Adding to knowledge base...")
         
         # Scrape article info for metadata
@@ -128,6 +178,13 @@ def process_url_task(self, scraped_url_id):
         
         # Update scraped_url with results
         with transaction.atomic():
+            # Saving a URL deleted in the meantime would re-create it
+            if not ScrapedURL.objects.select_for_update().filter(id=scraped_url_id).exists():
+                transaction.on_commit(
+                    lambda: discard_deleted_source(processor, scraped_url.company.name, source_key)
+                )
+                return {'status': 'deleted', 'source_key': source_key}
+            
             scraped_url.status = 'completed'
             scraped_url.processing_completed_at = timezone.now()
             scraped_url.chunks_created = result['chunks_added']
@@ -140,7 +197,8 @@ def process_url_task(self, scraped_url_id):
             company = scraped_url.company
             company.url_count = company.scraped_urls.filter(status='completed').count()
             company.last_processed_at = timezone.now()
-            company.save()
+            company.save(update_fields=['url_count', 'last_processed_at', 'updated_at'])
+            company.bump_knowledge_version()
         
         progress_recorder.set_progress(100, 100, description="URL scraping completed!")
         
@@ -171,4 +229,47 @@ def process_url_task(self, scraped_url_id):
         except:
             pass
         
+        return {'status': 'error', 'message': error_msg}
+
+
+@shared_task(bind=True)
+def delete_source_points_task(self, company_id, company_name, source_key):
+    """
+    Remove the Qdrant points of a deleted Document or ScrapedURL
+    """
+    progress_recorder = ProgressRecorder(self)
+    
+    try:
+        progress_recorder.set_progress(0, 100, description=f"Deleting points of {source_key}...")
+        
+        def report_deleted(deleted, total):
+            progress_recorder.set_progress(
+                deleted, total, description=f"Deleted {deleted} of {total} points..."
+            )
+        
+        processor = get_rag_processor()
+        points_deleted = processor.delete_source_points(
+            company_name, source_key, progress_callback=report_deleted
+        )
+        
+        # Update company counts, unless the company itself was deleted
+        company = Company.objects.filter(id=company_id).first()
+        if company:
+            company.document_count = company.documents.filter(status='completed').count()
+            company.url_count = company.scraped_urls.filter(status='completed').count()
+            company.save(update_fields=['document_count', 'url_count', 'updated_at'])
+            company.bump_knowledge_version()
+        
+        progress_recorder.set_progress(100, 100, description="Point deletion completed!")
+        
+        logger.info(f"Deleted {points_deleted} points of {source_key}")
+        return {
+            'status': 'success',
+            'source_key': source_key,
+            'points_deleted': points_deleted
+        }
+        
+    except Exception as e:
+        error_msg = f"Error deleting points of {source_key}: {str(e)}"
+        logger.error(error_msg)
         return {'status': 'error', 'message': error_msg}
\ No newline at end of file
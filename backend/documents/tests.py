@@ -0,0 +1,239 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from companies.models import Company
+from core.testing import QueryBudgetMixin, api_client, make_pdf
+from .models import Document, ExtractedTable, ScrapedURL
+from .tasks import process_document_task, process_url_task
+
+
+class FakeProcessor:
+    """
+    Stands in for the RAG processor and reports ``tables`` extracted tables;
+    ``during_ingestion`` is called while the content is being added
+    """
+
+    def __init__(self, tables=0, during_ingestion=None):
+        self.tables = tables
+        self.during_ingestion = during_ingestion
+
+    def add_to_knowledge_base(self, content, content_type, company_name, **kwargs):
+        if self.during_ingestion:
+            self.during_ingestion()
+        return {
+            'chunks_added': 10,
+            'tables_extracted': self.tables,
+            'pages_processed': 3,
+            'content_key': 'pdf:0123abcd',
+            'source_deleted': False,
+            'tables': [
+                {'page': 1, 'table_index': i, 'headers': ['Item', 'FY2023'], 'rows': [['Revenue', '4,200']]}
+                for i in range(self.tables)
+            ],
+        }
+
+    def scrape_news_article(self, url):
+        return {'title': 'Acme beats estimates', 'text': 'Revenue grew 12%'}
+
+
+@mock.patch('documents.tasks.ProgressRecorder')
+class ProcessDocumentTaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='analyst')
+        cls.company = Company.objects.create(name='Acme Inc.', created_by=cls.user)
+
+    def process(self, tables):
+        document = Document.objects.create(
+            company=self.company, uploaded_by=self.user, file='documents/report.pdf',
+            original_filename='report.pdf', file_size=1024, file_type='application/pdf'
+        )
+        with mock.patch('documents.tasks.get_rag_processor', return_value=FakeProcessor(tables)):
+            with CaptureQueriesContext(connection) as context:
+                result = process_document_task(document.id)
+        self.assertEqual(result['status'], 'success')
+        return document, context.captured_queries
+
+    def test_tables_are_inserted_in_one_query(self, _):
+        document, captured = self.process(tables=25)
+
+        table_inserts = [q for q in captured if q['sql'].startswith('INSERT INTO "documents_extractedtable"')]
+        self.assertEqual(len(table_inserts), 1)
+        self.assertEqual(document.extracted_tables.count(), 25)
+
+    def test_query_count_does_not_grow_with_tables(self, _):
+        _, one_table = self.process(tables=1)
+        _, many_tables = self.process(tables=25)
+
+        self.assertEqual(len(many_tables), len(one_table))
+        self.assertEqual(ExtractedTable.objects.count(), 26)
+
+
+class FakeEmbeddings:
+    """Small deterministic vectors instead of the embedding model"""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [len(text) % 7 + 1.0, sum(map(ord, text)) % 11 + 1.0, 1.0]
+
+
+class InMemoryRegistry:
+    """Resources of a real RAG processor backed by an in-memory Qdrant"""
+
+    def __init__(self):
+        from qdrant_client import QdrantClient
+
+        self.qdrant_client = QdrantClient(':memory:')
+
+    def get_embeddings(self):
+        return FakeEmbeddings()
+
+    def get_qdrant_client(self):
+        return self.qdrant_client
+
+    def get_llm(self):
+        return None
+
+    def get_tokenizer(self):
+        return None
+
+    def point_count(self):
+        return sum(
+            self.qdrant_client.count(collection.name).count
+            for collection in self.qdrant_client.get_collections().collections
+        )
+
+
+@mock.patch('documents.tasks.ProgressRecorder')
+class DuplicateUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='analyst')
+        cls.company = Company.objects.create(name='Acme Inc.', created_by=cls.user)
+
+    def setUp(self):
+        from core.rag_processor import DjangoFinancialRAGProcessor
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.registry = InMemoryRegistry()
+        processor = DjangoFinancialRAGProcessor(registry=self.registry)
+        for patcher in [
+            mock.patch('documents.tasks.get_rag_processor', return_value=processor),
+            # Process the upload right away instead of queueing it
+            mock.patch(
+                'documents.views.process_document_task.delay',
+                side_effect=lambda document_id: process_document_task.apply(args=(document_id,))
+            ),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.client = api_client(self.user)
+        self.pdf = make_pdf(pages=3)
+
+    def upload(self, filename='report.pdf'):
+        return self.client.post('/api/v1/documents/pdfs/', {
+            'company': self.company.id,
+            'file': SimpleUploadedFile(filename, self.pdf, content_type='application/pdf'),
+        }, format='multipart')
+
+    def test_same_file_is_not_ingested_twice(self, _):
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get()
+        self.assertEqual(document.status, 'completed')
+        points = self.registry.point_count()
+        self.assertGreater(points, 0)
+
+        response = self.upload(filename='report-copy.pdf')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['document']['id'], document.id)
+        self.assertEqual(Document.objects.count(), 1)
+        self.assertEqual(self.registry.point_count(), points)
+
+    def test_failed_upload_can_be_retried(self, _):
+        self.upload()
+        Document.objects.update(status='failed')
+
+        response = self.upload()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Document.objects.filter(status='completed').count(), 1)
+
+
+@mock.patch('documents.tasks.ProgressRecorder')
+class KnowledgeVersionTests(TestCase):
+    """Finishing an ingestion must not undo version bumps made while it ran"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='analyst')
+        cls.company = Company.objects.create(name='Acme Inc.', created_by=cls.user)
+
+    def concurrent_bump(self):
+        # Another task finishing, or a delete, while this one is ingesting
+        Company.objects.get(pk=self.company.pk).bump_knowledge_version()
+
+    def run_task(self, task, source_id):
+        processor = FakeProcessor(during_ingestion=self.concurrent_bump)
+        with mock.patch('documents.tasks.get_rag_processor', return_value=processor):
+            result = task(source_id)
+        self.assertEqual(result['status'], 'success')
+
+    def test_document_task_keeps_concurrent_bumps(self, _):
+        document = Document.objects.create(
+            company=self.company, uploaded_by=self.user, file='documents/report.pdf',
+            original_filename='report.pdf', file_size=1024, file_type='application/pdf'
+        )
+        self.run_task(process_document_task, document.id)
+
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.knowledge_version, 2)
+        self.assertEqual(self.company.document_count, 1)
+
+    def test_url_task_keeps_concurrent_bumps(self, _):
+        scraped_url = ScrapedURL.objects.create(
+            company=self.company, added_by=self.user, url='https://example.com/acme', source_domain='example.com'
+        )
+        self.run_task(process_url_task, scraped_url.id)
+
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.knowledge_version, 2)
+        self.assertEqual(self.company.url_count, 1)
+
+
+class DocumentQueryCountTests(QueryBudgetMixin, TestCase):
+    def test_list(self):
+        self.assertQueryBudget(2, lambda data: '/api/v1/documents/pdfs/')
+
+    def test_list_with_tables(self):
+        self.assertQueryBudget(3, lambda data: '/api/v1/documents/pdfs/?expand=extracted_tables')
+
+    def test_detail(self):
+        self.assertQueryBudget(2, lambda data: f'/api/v1/documents/pdfs/{data.documents[0].id}/')
+
+    def test_tables(self):
+        self.assertQueryBudget(3, lambda data: f'/api/v1/documents/pdfs/{data.documents[0].id}/tables/')
+
+
+class ScrapedURLQueryCountTests(QueryBudgetMixin, TestCase):
+    def test_list(self):
+        self.assertQueryBudget(2, lambda data: '/api/v1/documents/urls/')
+
+    def test_detail(self):
+        self.assertQueryBudget(1, lambda data: f'/api/v1/documents/urls/{data.urls[0].id}/')
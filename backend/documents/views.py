@@ -1,31 +1,65 @@
+import hashlib
 import logging
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
 
 from .models import Document, ScrapedURL
 from .serializers import (
-    DocumentSerializer, DocumentUploadSerializer, 
-    ScrapedURLSerializer
+    DocumentSerializer, DocumentSummarySerializer, DocumentUploadSerializer,
+    ExtractedTableSerializer, ScrapedURLSerializer, query_param_list
 )
 from .tasks import process_document_task, process_url_task
 from companies.models import Company
+from core.stats_cache import cached_stats
 
 logger = logging.getLogger(__name__)
 
 
+def status_counts(queryset):
+    """Total and per-status counts in a single query"""
+    return queryset.aggregate(
+        total=Count('id'),
+        **{
+            status_code: Count('id', filter=Q(status=status_code))
+            for status_code in ['completed', 'processing', 'failed', 'pending']
+        }
+    )
+
+
+def uploaded_file_sha256(uploaded_file):
+    """sha256 of an upload, the digest ingestion stores as Document.content_hash"""
+    digest = hashlib.sha256()
+    for block in uploaded_file.chunks():
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
 class DocumentViewSet(viewsets.ModelViewSet):
     serializer_class = DocumentSerializer
     parser_classes = [MultiPartParser, FormParser]
     
     def get_queryset(self):
-        return Document.objects.filter(company__created_by=self.request.user)
+        queryset = Document.objects.filter(company__created_by=self.request.user).select_related('company')
+        if self._includes_tables():
+            queryset = queryset.prefetch_related('extracted_tables')
+        return queryset
+
+    def _includes_tables(self):
+        """Whether the response inlines the documents' extracted tables"""
+        if self.action == 'list':
+            return 'extracted_tables' in (query_param_list(self.request, 'expand') or [])
+        return self.action in ('retrieve', 'update', 'partial_update')
 
     def get_serializer_class(self):
         if self.action == 'create':
             return DocumentUploadSerializer
+        if self.action == 'list':
+            return DocumentSummarySerializer
         return DocumentSerializer
 
     def create(self, request, *args, **kwargs):
@@ -36,8 +70,22 @@ class DocumentViewSet(viewsets.ModelViewSet):
         # Verify user owns the company
         company = get_object_or_404(Company, id=serializer.validated_data['company'].id, created_by=request.user)
         
+        # Check if the same file was already uploaded for this company; a
+        # second copy would add every chunk to the collection again
+        content_hash = uploaded_file_sha256(serializer.validated_data['file'])
+        existing = Document.objects.filter(
+            company=company,
+            content_hash=content_hash
+        ).exclude(status='failed').first()
+        
+        if existing:
+            return Response({
+                'message': 'This file has already been uploaded for this company.',
+                'document': DocumentSerializer(existing).data
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         # Create document
-        document = serializer.save()
+        document = serializer.save(content_hash=content_hash)
         
         # Start async processing
         task = process_document_task.delay(document.id)
@@ -50,6 +98,16 @@ class DocumentViewSet(viewsets.ModelViewSet):
             'message': 'Document uploaded successfully. Processing started.'
         }, status=status.HTTP_201_CREATED)
 
+    def destroy(self, request, *args, **kwargs):
+        """Delete a document; its vectors are removed by a background task"""
+        document = self.get_object()
+        document.delete()
+        
+        return Response({
+            'task_id': getattr(document, 'point_deletion_task_id', None),
+            'message': 'Document deleted. Removing it from the knowledge base.'
+        }, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=True, methods=['get'])
     def processing_status(self, request, pk=None):
         """Get document processing status"""
@@ -70,18 +128,18 @@ class DocumentViewSet(viewsets.ModelViewSet):
             'progress': 50 if document.status == 'processing' else 0
         })
 
+    @action(detail=True, methods=['get'])
+    def tables(self, request, pk=None):
+        """Paginated extracted tables of a document"""
+        document = self.get_object()
+        page = self.paginate_queryset(document.extracted_tables.all())
+        serializer = ExtractedTableSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get document processing statistics"""
-        queryset = self.get_queryset()
-        
-        stats = {
-            'total': queryset.count(),
-            'completed': queryset.filter(status='completed').count(),
-            'processing': queryset.filter(status='processing').count(),
-            'failed': queryset.filter(status='failed').count(),
-            'pending': queryset.filter(status='pending').count(),
-        }
+        stats = cached_stats(request.user.id, 'documents', lambda: status_counts(self.get_queryset()))
         
         return Response(stats)
 
@@ -90,7 +148,7 @@ class ScrapedURLViewSet(viewsets.ModelViewSet):
     serializer_class = ScrapedURLSerializer
     
     def get_queryset(self):
-        return ScrapedURL.objects.filter(company__created_by=self.request.user)
+        return ScrapedURL.objects.filter(company__created_by=self.request.user).select_related('company')
 
     def create(self, request, *args, **kwargs):
         """Add and process URL"""
@@ -126,6 +184,16 @@ class ScrapedURLViewSet(viewsets.ModelViewSet):
             'message': 'URL added successfully. Processing started.'
         }, status=status.HTTP_201_CREATED)
 
+    def destroy(self, request, *args, **kwargs):
+        """Delete a URL; its vectors are removed by a background task"""
+        scraped_url = self.get_object()
+        scraped_url.delete()
+        
+        return Response({
+            'task_id': getattr(scraped_url, 'point_deletion_task_id', None),
+            'message': 'URL deleted. Removing it from the knowledge base.'
+        }, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=True, methods=['get'])
     def processing_status(self, request, pk=None):
         """Get URL processing status"""
@@ -147,14 +215,6 @@ class ScrapedURLViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get URL processing statistics"""
-        queryset = self.get_queryset()
-        
-        stats = {
-            'total': queryset.count(),
-            'completed': queryset.filter(status='completed').count(),
-            'processing': queryset.filter(status='processing').count(),
-            'failed': queryset.filter(status='failed').count(),
-            'pending': queryset.filter(status='pending').count(),
-        }
+        stats = cached_stats(request.user.id, 'urls', lambda: status_counts(self.get_queryset()))
         
         return Response(stats)
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""
+ASGI config for financerag project.
+
+Serves the async query path (`/api/v1/queries/ask_async/`) without a thread per
+in-flight question, e.g. `gunicorn financerag.asgi:application -k uvicorn.workers.UvicornWorker`.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'financerag.settings')
+
+application = get_asgi_application()
+
+# Warm the shared RAG resources up front, as in wsgi.py
+from django.conf import settings  # noqa: E402
+
+if settings.RAG_SETTINGS.get('WARM_UP_ON_START'):
+    from core.registry import rag_registry  # noqa: E402
+    rag_registry.warm_up()
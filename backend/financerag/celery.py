@@ -1,9 +1,15 @@
+import gc
+import logging
 import os
 from celery import Celery
+from celery.exceptions import WorkerShutdown
+from celery.signals import worker_init, worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'financerag.settings')
 
+logger = logging.getLogger(__name__)
+
 app = Celery('financerag')
 
 # Using a string here means the worker doesn't have to serialize
@@ -14,6 +20,52 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 
+@worker_init.connect
+def preload_rag_models(sender=None, **kwargs):
+    """
+    Load the embedding model once in the parent worker process, before the
+    prefork pool starts, so every child shares the weights copy-on-write.
+    The worker refuses to start if the warm-up encode fails.
+    """
+    from django.conf import settings
+
+    rag_settings = settings.RAG_SETTINGS
+    if not rag_settings.get('WORKER_PRELOAD', True):
+        return
+
+    if rag_settings.get('WORKER_OFFLINE', True):
+        # Must be set before huggingface_hub/transformers are imported
+        os.environ.setdefault('HF_HUB_OFFLINE', '1')
+        os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+    from core.registry import rag_registry
+
+    try:
+        metrics = rag_registry.warm_up(embeddings=True, qdrant=False, llm=False)
+    except Exception as e:
+        logger.error(
+            f"Embedding warm-up failed, refusing to start worker: {e}. "
+            f"With RAG_WORKER_OFFLINE enabled the model must already be in the local HuggingFace cache."
+        )
+        raise WorkerShutdown(f"Embedding warm-up failed: {e}")
+
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # children don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    load_time = metrics['resources']['embeddings']['last_load_time_ms']
+    logger.info(f"Embedding model preloaded in {load_time}ms, worker ready to accept tasks")
+
+
+@worker_process_init.connect
+def reset_rag_clients(**kwargs):
+    """Drop network clients inherited from the parent, keep the shared model"""
+    from core.registry import rag_registry
+
+    rag_registry.reset_after_fork()
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
-    print(f'Request: {self.request!r}')
\ No newline at end of file
+    print(f'Request: {self.request!r}')
@@ -64,6 +64,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'financerag.wsgi.application'
+ASGI_APPLICATION = 'financerag.asgi.application'
 
 # Database
 DATABASES = {
@@ -142,18 +143,108 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Question answering runs on its own queue so query workers scale separately from ingestion
+CELERY_TASK_ROUTES = {
+    'queries.tasks.answer_query_task': {'queue': 'rag_query'},
+}
+
+# Cache (answer cache, stats)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default='redis://localhost:6379/1'),
+    }
+}
 
 # RAG Pipeline Settings
 RAG_SETTINGS = {
     'QDRANT_HOST': config('QDRANT_HOST', default='localhost'),
     'QDRANT_PORT': config('QDRANT_PORT', default=6333, cast=int),
+    'QDRANT_GRPC_PORT': config('QDRANT_GRPC_PORT', default=6334, cast=int),
+    'QDRANT_PREFER_GRPC': config('QDRANT_PREFER_GRPC', default=False, cast=bool),
+    'QDRANT_TIMEOUT': config('QDRANT_TIMEOUT', default=30, cast=int),
+    'QDRANT_POOL_SIZE': config('QDRANT_POOL_SIZE', default=10, cast=int),
+    # Collection tuning, applied on creation and by `manage.py apply_collection_settings`
+    'QDRANT_HNSW_M': config('QDRANT_HNSW_M', default=16, cast=int),
+    'QDRANT_HNSW_EF_CONSTRUCT': config('QDRANT_HNSW_EF_CONSTRUCT', default=100, cast=int),
+    'QDRANT_ON_DISK_VECTORS': config('QDRANT_ON_DISK_VECTORS', default=False, cast=bool),
+    # 'none' or 'int8' (scalar quantization; quantized vectors kept in RAM, originals used for rescoring)
+    'QDRANT_QUANTIZATION': config('QDRANT_QUANTIZATION', default='none'),
+    'QDRANT_QUANTIZATION_ALWAYS_RAM': config('QDRANT_QUANTIZATION_ALWAYS_RAM', default=True, cast=bool),
+    # Search: HNSW ef (0 = server default), rescoring and oversampling with quantization
+    'QDRANT_HNSW_EF': config('QDRANT_HNSW_EF', default=128, cast=int),
+    'QDRANT_QUANTIZATION_RESCORE': config('QDRANT_QUANTIZATION_RESCORE', default=True, cast=bool),
+    'QDRANT_QUANTIZATION_OVERSAMPLING': config('QDRANT_QUANTIZATION_OVERSAMPLING', default=2.0, cast=float),
+    # Retrieval: chunks passed to the LLM; hybrid search fuses dense and BM25 candidates with RRF
+    'RETRIEVAL_K': config('RETRIEVAL_K', default=5, cast=int),
+    'HYBRID_SEARCH_ENABLED': config('HYBRID_SEARCH_ENABLED', default=True, cast=bool),
+    'HYBRID_PREFETCH_K': config('HYBRID_PREFETCH_K', default=20, cast=int),
+    'RRF_K': config('RRF_K', default=60, cast=int),
+    # Prompt context: token budget counted with the LLM's HuggingFace tokenizer (chars/4 estimate if unavailable),
+    # MMR relevance/diversity trade-off, near-duplicate cut-off and per-table token cap
+    'CONTEXT_TOKENIZER': config('CONTEXT_TOKENIZER', default='microsoft/Phi-3-mini-4k-instruct'),
+    'CONTEXT_TOKEN_BUDGET': config('CONTEXT_TOKEN_BUDGET', default=1500, cast=int),
+    'CONTEXT_MMR_LAMBDA': config('CONTEXT_MMR_LAMBDA', default=0.7, cast=float),
+    'CONTEXT_DUPLICATE_THRESHOLD': config('CONTEXT_DUPLICATE_THRESHOLD', default=0.85, cast=float),
+    'CONTEXT_MAX_TABLE_TOKENS': config('CONTEXT_MAX_TABLE_TOKENS', default=400, cast=int),
+    # Ingestion writes: points per upsert request, concurrent requests, retries on transient errors
+    'UPSERT_BATCH_SIZE': config('UPSERT_BATCH_SIZE', default=256, cast=int),
+    'UPSERT_PARALLEL': config('UPSERT_PARALLEL', default=2, cast=int),
+    'UPSERT_MAX_RETRIES': config('UPSERT_MAX_RETRIES', default=3, cast=int),
     'EMBEDDING_MODEL': config('EMBEDDING_MODEL', default='BAAI/bge-large-en-v1.5'),
+    # 'torch' (sentence-transformers) or 'onnx' (ONNX Runtime, see export_onnx_embeddings)
+    'EMBEDDING_BACKEND': config('EMBEDDING_BACKEND', default='torch'),
+    'ONNX_MODEL_PATH': config('ONNX_MODEL_PATH', default=str(BASE_DIR / 'models' / 'onnx')),
+    'ONNX_MODEL_FILE': config('ONNX_MODEL_FILE', default='model_quantized.onnx'),
+    'ONNX_NUM_THREADS': config('ONNX_NUM_THREADS', default=0, cast=int),
+    'EMBEDDING_POOLING': config('EMBEDDING_POOLING', default='cls'),  # bge models use the CLS token
     'LLM_MODEL': config('LLM_MODEL', default='phi3:mini'),
+    'OLLAMA_BASE_URL': config('OLLAMA_BASE_URL', default='http://localhost:11434'),
+    # Async query path: Ollama request timeout (seconds) and connections per event loop
+    'OLLAMA_TIMEOUT': config('OLLAMA_TIMEOUT', default=120, cast=int),
+    'OLLAMA_POOL_SIZE': config('OLLAMA_POOL_SIZE', default=100, cast=int),
+    # Admission control: concurrent generations across all processes (0 = unlimited), waiting
+    # requests allowed, and seconds a request may wait before it is rejected with 429
+    'LLM_MAX_CONCURRENCY': config('LLM_MAX_CONCURRENCY', default=2, cast=int),
+    'LLM_MAX_QUEUE': config('LLM_MAX_QUEUE', default=20, cast=int),
+    'LLM_QUEUE_TIMEOUT': config('LLM_QUEUE_TIMEOUT', default=30, cast=int),
+    'LLM_LIMITER_REDIS_URL': config('LLM_LIMITER_REDIS_URL', default=CELERY_BROKER_URL),
     'CHUNK_SIZE': config('CHUNK_SIZE', default=1000, cast=int),
     'CHUNK_OVERLAP': config('CHUNK_OVERLAP', default=200, cast=int),
     'MAX_FILE_SIZE': config('MAX_FILE_SIZE', default=50 * 1024 * 1024, cast=int),  # 50MB
+    # Load embeddings/Qdrant/LLM when the WSGI app starts instead of on the first request
+    'WARM_UP_ON_START': config('RAG_WARM_UP_ON_START', default=False, cast=bool),
+    # Ingestion embedding: chunks per encode batch and encode processes (0 = in-process, -1 = one per core)
+    'EMBEDDING_BATCH_SIZE': config('EMBEDDING_BATCH_SIZE', default=32, cast=int),
+    # Off by default: prefork Celery children are daemonic and can't start the
+    # encode pool, so it only takes effect in workers run with --pool threads or
+    # --pool solo and in management commands; elsewhere encoding stays in-process
+    'EMBEDDING_PROCESSES': config('EMBEDDING_PROCESSES', default=0, cast=int),
+    # Chunks embedded and upserted together while streaming a PDF
+    'INGEST_BATCH_SIZE': config('INGEST_BATCH_SIZE', default=64, cast=int),
+    # Rows per INSERT when saving extracted tables and query sources
+    'DB_BULK_BATCH_SIZE': config('DB_BULK_BATCH_SIZE', default=500, cast=int),
+    # Skip pdfplumber's table finder on pages that can't hold a table; strict mode scans every page
+    'TABLE_PRESCAN_STRICT': config('TABLE_PRESCAN_STRICT', default=False, cast=bool),
+    'TABLE_PRESCAN_MIN_NUMERIC_RATIO': config('TABLE_PRESCAN_MIN_NUMERIC_RATIO', default=0.0, cast=float),
+    # Reuse embeddings of identical chunks (keyed by model + normalized text hash)
+    'EMBEDDING_CACHE_ENABLED': config('EMBEDDING_CACHE_ENABLED', default=True, cast=bool),
+    'EMBEDDING_CACHE_MAX_ENTRIES': config('EMBEDDING_CACHE_MAX_ENTRIES', default=500000, cast=int),
+    # Cache answers per collection version; a threshold > 0 also matches paraphrases
+    'ANSWER_CACHE_ENABLED': config('ANSWER_CACHE_ENABLED', default=True, cast=bool),
+    'ANSWER_CACHE_TTL': config('ANSWER_CACHE_TTL', default=24 * 60 * 60, cast=int),
+    'ANSWER_CACHE_SIMILARITY_THRESHOLD': config('ANSWER_CACHE_SIMILARITY_THRESHOLD', default=0.0, cast=float),
+    # Cache the stats endpoints per user (0 disables); saving a document, URL or query invalidates them
+    'STATS_CACHE_TTL': config('STATS_CACHE_TTL', default=300, cast=int),
+    # Celery: load the embedding model in the parent process before the pool forks
+    'WORKER_PRELOAD': config('RAG_WORKER_PRELOAD', default=True, cast=bool),
+    # Celery: load models from the local HuggingFace cache only (no hub requests)
+    'WORKER_OFFLINE': config('RAG_WORKER_OFFLINE', default=True, cast=bool),
 }
 
+# `manage.py check_startup_time` fails if `manage.py check` takes longer than this
+STARTUP_IMPORT_BUDGET_MS = config('STARTUP_IMPORT_BUDGET_MS', default=3000, cast=int)
+
 # Logging
 LOGGING = {
     'version': 1,
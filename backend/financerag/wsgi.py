@@ -8,4 +8,11 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'financerag.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Warm the shared RAG resources up front (pairs well with gunicorn --preload)
+from django.conf import settings  # noqa: E402
+
+if settings.RAG_SETTINGS.get('WARM_UP_ON_START'):
+    from core.registry import rag_registry  # noqa: E402
+    rag_registry.warm_up()
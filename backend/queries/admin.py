@@ -11,9 +11,9 @@ class QuerySourceInline(admin.TabularInline):
 @admin.register(Query)
 class QueryAdmin(admin.ModelAdmin):
     list_display = ['question_preview', 'company', 'user', 'category', 'sources_count', 'response_time_ms', 'created_at']
-    list_filter = ['category', 'created_at', 'company', 'context_found']
+    list_filter = ['category', 'created_at', 'company', 'context_found', 'cache_hit']
     search_fields = ['question', 'answer', 'company__name', 'user__username']
-    readonly_fields = ['created_at', 'response_time_ms', 'sources_count']
+    readonly_fields = ['created_at', 'response_time_ms', 'time_to_first_token_ms', 'sources_count', 'prompt_tokens']
     inlines = [QuerySourceInline]
     
     fieldsets = (
@@ -24,7 +24,7 @@ class QueryAdmin(admin.ModelAdmin):
             'fields': ('question', 'answer')
         }),
         ('Results', {
-            'fields': ('context_found', 'sources_count', 'response_time_ms')
+            'fields': ('context_found', 'cache_hit', 'sources_count', 'response_time_ms', 'time_to_first_token_ms', 'prompt_tokens')
         }),
         ('Metadata', {
             'fields': ('created_at',)
@@ -0,0 +1,101 @@
+"""
+Answer cache for QueryViewSet.ask
+
+Entries are keyed by the company's collection, its knowledge_version and the
+normalized question (and retrieval filters), so any change to the collection
+invalidates them. With a
+similarity threshold configured, paraphrased questions are matched by cosine
+similarity of their embeddings.
+"""
+import hashlib
+import json
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Cap on questions kept per collection version for similarity matching
+SEMANTIC_INDEX_SIZE = 200
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+
+def normalize_question(question):
+    question = _PUNCTUATION_RE.sub(' ', question.lower())
+    return ' '.join(question.split())
+
+
+class AnswerCache:
+    def __init__(self, company, filters=None):
+        rag_settings = settings.RAG_SETTINGS
+        self.enabled = rag_settings.get('ANSWER_CACHE_ENABLED', False)
+        self.timeout = rag_settings.get('ANSWER_CACHE_TTL')
+        self.similarity_threshold = rag_settings.get('ANSWER_CACHE_SIMILARITY_THRESHOLD') or 0
+        self.prefix = f"answer:{company.qdrant_collection_name}:v{company.knowledge_version}"
+        if filters:
+            # Filtered answers only match questions asked with the same filters
+            filters_digest = hashlib.sha256(json.dumps(filters, sort_keys=True).encode('utf-8')).hexdigest()
+            self.prefix = f"{self.prefix}:f{filters_digest[:16]}"
+
+    def _key(self, question):
+        digest = hashlib.sha256(normalize_question(question).encode('utf-8')).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    @property
+    def _index_key(self):
+        return f"{self.prefix}:index"
+
+    def _embed(self, question):
+        from core.registry import rag_registry
+        return rag_registry.get_embeddings().embed_query(normalize_question(question))
+
+    def get(self, question):
+        """Return a cached result dict or None"""
+        if not self.enabled:
+            return None
+
+        try:
+            result = cache.get(self._key(question))
+            if result is None and self.similarity_threshold:
+                result = self._get_similar(question)
+            return result
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {e}")
+            return None
+
+    def _get_similar(self, question):
+        index = cache.get(self._index_key) or []
+        if not index:
+            return None
+
+        vector = self._embed(question)
+        best_key, best_score = None, 0.0
+        for key, cached_vector in index:
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            score = sum(a * b for a, b in zip(vector, cached_vector))
+            if score > best_score:
+                best_key, best_score = key, score
+
+        if best_key and best_score >= self.similarity_threshold:
+            logger.info(f"Answer cache similarity hit ({best_score:.3f})")
+            return cache.get(best_key)
+        return None
+
+    def set(self, question, result):
+        if not self.enabled:
+            return
+
+        try:
+            key = self._key(question)
+            cache.set(key, result, timeout=self.timeout)
+
+            if self.similarity_threshold:
+                index = cache.get(self._index_key) or []
+                if not any(existing_key == key for existing_key, _ in index):
+                    index.append((key, self._embed(question)))
+                    cache.set(self._index_key, index[-SEMANTIC_INDEX_SIZE:], timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"Answer cache store failed: {e}")
@@ -0,0 +1,120 @@
+"""
+Answering steps shared by QueryViewSet.ask, ask_async and answer_query_task:
+answer cache lookup, saving the query and building the response
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .answer_cache import AnswerCache
+from .models import Query, QuerySource
+
+logger = logging.getLogger(__name__)
+
+
+def save_query(company, user, question, category, result, response_time_ms, cache_hit,
+               time_to_first_token_ms=None):
+    """Save the query and its sources"""
+    with transaction.atomic():
+        query = Query.objects.create(
+            company=company,
+            user=user,
+            question=question,
+            answer=result['answer'],
+            category=category,
+            sources_count=len(result['sources']),
+            response_time_ms=response_time_ms,
+            time_to_first_token_ms=time_to_first_token_ms,
+            context_found=result.get('context_found', True),
+            cache_hit=cache_hit,
+            prompt_tokens=result.get('prompt_tokens')
+        )
+
+        # Save sources
+        QuerySource.objects.bulk_create(
+            [
+                QuerySource(
+                    query=query,
+                    source_type=source_data['type'],
+                    source_name=source_data['source'],
+                    content_snippet=source_data['content'],
+                    metadata={
+                        'title': source_data.get('title', ''),
+                        'url': source_data.get('url', ''),
+                        'page': source_data.get('page', ''),
+                        'date': source_data.get('date', ''),
+                        'headers': source_data.get('headers', [])
+                    }
+                )
+                for source_data in result['sources']
+            ],
+            batch_size=settings.RAG_SETTINGS.get('DB_BULK_BATCH_SIZE', 500)
+        )
+    return query
+
+
+def save_failed_query(company, user, question, category, error, start_time):
+    """Still save the failed query for debugging"""
+    try:
+        with transaction.atomic():
+            Query.objects.create(
+                company=company,
+                user=user,
+                question=question,
+                answer=f"Error processing query: {str(error)}",
+                category=category,
+                sources_count=0,
+                response_time_ms=int((time.time() - start_time) * 1000),
+                context_found=False
+            )
+    except:
+        pass
+
+
+def lookup_answer(company, question, filters=None):
+    """Returns (answer cache, cached result or None)"""
+    answer_cache = AnswerCache(company, filters=filters)
+    return answer_cache, answer_cache.get(question)
+
+
+def record_answer(company, user, question, category, result, cache_hit, answer_cache, start_time):
+    """
+    Cache a fresh answer, save the query and return the response data
+    (the fields of QueryResponseSerializer)
+    """
+    if not cache_hit and not result.get('llm_error'):
+        answer_cache.set(question, result)
+
+    response_time_ms = int((time.time() - start_time) * 1000)
+    query = save_query(company, user, question, category, result, response_time_ms, cache_hit)
+
+    logger.info(f"Successfully answered query {query.id} for company {company.name} (cache hit: {cache_hit})")
+    return {
+        'query_id': query.id,
+        'question': question,
+        'answer': result['answer'],
+        'company': company.name,
+        'sources': result['sources'],
+        'context_found': result.get('context_found', True),
+        'cache_hit': cache_hit,
+        'prompt_tokens': result.get('prompt_tokens'),
+        'response_time_ms': response_time_ms,
+        'created_at': query.created_at
+    }
+
+
+def busy_error_data(error):
+    """Body of the response to an LLMBusyError"""
+    return {'error': 'LLM busy', 'message': str(error), 'retry_after': error.retry_after}
+
+
+def failed_query_data(error, question, company):
+    """Body of the response to any other error"""
+    return {
+        'error': 'Failed to process query',
+        'message': str(error),
+        'question': question,
+        'company': company.name
+    }
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class QueriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'queries'
\ No newline at end of file
+    name = 'queries'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -23,10 +23,16 @@ class Query(models.Model):
     # Metadata
     sources_count = models.IntegerField(default=0)
     response_time_ms = models.IntegerField(blank=True, null=True)
+    # Streamed answers only: time until the first answer token was sent
+    time_to_first_token_ms = models.IntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     # Context information
     context_found = models.BooleanField(default=True)
+    # Served from the answer cache instead of the RAG pipeline
+    cache_hit = models.BooleanField(default=False)
+    # Tokens in the LLM prompt after context packing
+    prompt_tokens = models.IntegerField(blank=True, null=True)
     
     class Meta:
         ordering = ['-created_at']
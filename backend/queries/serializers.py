@@ -18,12 +18,12 @@ class QuerySerializer(serializers.ModelSerializer):
         model = Query
         fields = [
             'id', 'company', 'company_name', 'question', 'answer', 'category',
-            'sources_count', 'response_time_ms', 'created_at', 'context_found',
-            'sources'
+            'sources_count', 'response_time_ms', 'time_to_first_token_ms', 'created_at',
+            'context_found', 'cache_hit', 'prompt_tokens', 'sources'
         ]
         read_only_fields = [
-            'id', 'answer', 'sources_count', 'response_time_ms', 'created_at',
-            'context_found'
+            'id', 'answer', 'sources_count', 'response_time_ms', 'time_to_first_token_ms',
+            'created_at', 'context_found', 'cache_hit', 'prompt_tokens'
         ]
 
 
@@ -35,6 +35,17 @@ class QueryRequestSerializer(serializers.Serializer):
         default='general',
         required=False
     )
+    # Optional retrieval filters, pushed down into the Qdrant search
+    source_types = serializers.MultipleChoiceField(
+        choices=['financial_report', 'financial_table', 'news'],
+        required=False
+    )
+    document_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False
+    )
+    date_from = serializers.DateField(required=False)
 
     def validate_question(self, value):
         if len(value.strip()) < 10:
@@ -43,6 +54,18 @@ class QueryRequestSerializer(serializers.Serializer):
             )
         return value.strip()
 
+    def get_filters(self):
+        """Retrieval filters in the form the RAG processor accepts, or None"""
+        data = self.validated_data
+        filters = {}
+        if data.get('source_types'):
+            filters['types'] = sorted(data['source_types'])
+        if data.get('document_ids'):
+            filters['document_ids'] = sorted(set(data['document_ids']))
+        if data.get('date_from'):
+            filters['date_from'] = data['date_from'].isoformat()
+        return filters or None
+
 
 class QueryResponseSerializer(serializers.Serializer):
     query_id = serializers.IntegerField()
@@ -51,5 +74,7 @@ class QueryResponseSerializer(serializers.Serializer):
     company = serializers.CharField()
     sources = QuerySourceSerializer(many=True)
     context_found = serializers.BooleanField()
+    cache_hit = serializers.BooleanField(default=False)
+    prompt_tokens = serializers.IntegerField(allow_null=True, required=False)
     response_time_ms = serializers.IntegerField()
     created_at = serializers.DateTimeField()
\ No newline at end of file
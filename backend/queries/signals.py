@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Query
+from core.stats_cache import invalidate_stats
+
+
+@receiver(post_save, sender=Query)
+@receiver(post_delete, sender=Query)
+def invalidate_owner_stats(sender, instance, **kwargs):
+    # After commit, so the stats aren't recomputed from uncommitted rows
+    user_id = instance.company.created_by_id
+    transaction.on_commit(lambda: invalidate_stats(user_id))
@@ -0,0 +1,68 @@
+import logging
+import time
+from celery import shared_task
+from celery_progress.backend import ProgressRecorder
+from django.contrib.auth.models import User
+
+from .answering import (
+    busy_error_data, failed_query_data, lookup_answer, record_answer, save_failed_query
+)
+from companies.models import Company
+from core.llm_limiter import LLMBusyError
+from core.registry import get_rag_processor
+
+logger = logging.getLogger(__name__)
+
+# Times a question is put back on the queue when no generation slot frees up
+LLM_BUSY_MAX_RETRIES = 3
+
+
+@shared_task(bind=True, max_retries=LLM_BUSY_MAX_RETRIES)
+def answer_query_task(self, company_id, user_id, question, category='general', filters=None):
+    """
+    Answer a question on the rag_query queue (see QueryViewSet.ask_queued).
+    The result has the same fields as the `ask` response.
+    """
+    progress_recorder = ProgressRecorder(self)
+    start_time = time.time()
+
+    try:
+        company = Company.objects.get(id=company_id, created_by_id=user_id)
+        user = User.objects.get(id=user_id)
+    except (Company.DoesNotExist, User.DoesNotExist):
+        error_msg = f"Company {company_id} not found"
+        logger.error(error_msg)
+        return {'status': 'error', 'error': 'Not found', 'message': error_msg}
+
+    try:
+        progress_recorder.set_progress(10, 100, description="Checking answer cache...")
+        answer_cache, result = lookup_answer(company, question, filters)
+        cache_hit = result is not None
+
+        if not cache_hit:
+            progress_recorder.set_progress(30, 100, description="Generating answer...")
+            result = get_rag_processor().analyze_company(question, company.name, filters=filters)
+
+        # Time spent waiting on the queue isn't part of the response time
+        response_data = record_answer(company, user, question, category, result, cache_hit, answer_cache, start_time)
+        progress_recorder.set_progress(100, 100, description="Answer ready")
+
+        return {
+            'status': 'success',
+            **response_data,
+            'created_at': response_data['created_at'].isoformat()
+        }
+
+    except LLMBusyError as e:
+        if self.request.retries < self.max_retries:
+            logger.warning(f"LLM busy for queued query on company {company.name}, retrying in {e.retry_after}s")
+            raise self.retry(exc=e, countdown=e.retry_after)
+
+        logger.warning(f"Rejected queued query for company {company.name}: {e}")
+        return {'status': 'error', **busy_error_data(e)}
+
+    except Exception as e:
+        error_msg = f"Error processing queued query for company {company.name}: {str(e)}"
+        logger.error(error_msg)
+        save_failed_query(company, user, question, category, e, start_time)
+        return {'status': 'error', **failed_query_data(e, question, company)}
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from companies.models import Company
+from core.testing import QueryBudgetMixin
+from .answering import save_query
+from .models import Query
+
+
+def answer_with_sources(count):
+    return {
+        'answer': 'Revenue grew 12%',
+        'sources': [
+            {'type': 'pdf', 'source': f'report-{i}.pdf', 'content': 'Revenue grew', 'page': i + 1}
+            for i in range(count)
+        ],
+        'context_found': True,
+        'prompt_tokens': 120,
+    }
+
+
+class SaveQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='analyst')
+        cls.company = Company.objects.create(name='Acme Inc.', created_by=cls.user)
+
+    def save(self, sources_count):
+        with CaptureQueriesContext(connection) as context:
+            query = save_query(
+                self.company, self.user, 'What was the revenue?', 'general',
+                answer_with_sources(sources_count), response_time_ms=10, cache_hit=False
+            )
+        return query, context.captured_queries
+
+    def test_sources_are_inserted_in_one_query(self):
+        query, captured = self.save(sources_count=25)
+
+        source_inserts = [q for q in captured if q['sql'].startswith('INSERT INTO "queries_querysource"')]
+        self.assertEqual(len(source_inserts), 1)
+        self.assertEqual(query.sources.count(), 25)
+        self.assertEqual(query.sources_count, 25)
+
+    def test_query_count_does_not_grow_with_sources(self):
+        _, one_source = self.save(sources_count=1)
+        _, many_sources = self.save(sources_count=25)
+
+        self.assertEqual(len(many_sources), len(one_source))
+        self.assertEqual(Query.objects.count(), 2)
+
+
+class QueryHistoryQueryCountTests(QueryBudgetMixin, TestCase):
+    def test_list(self):
+        self.assertQueryBudget(3, lambda data: '/api/v1/queries/')
+
+    def test_detail(self):
+        self.assertQueryBudget(2, lambda data: f'/api/v1/queries/{data.queries[0].id}/')
+
+    def test_recent(self):
+        self.assertQueryBudget(2, lambda data: '/api/v1/queries/recent/')
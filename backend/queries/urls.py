@@ -6,5 +6,7 @@ router = DefaultRouter()
 router.register(r'', views.QueryViewSet, basename='query')
 
 urlpatterns = [
+    # Plain Django async view, ahead of the router's detail route
+    path('ask_async/', views.ask_async, name='query-ask-async'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
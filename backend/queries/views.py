@@ -1,26 +1,88 @@
+import json
 import logging
 import time
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.db.models import Avg, Count, Q
 
-from .models import Query, QuerySource
+from .models import Query
+from .answering import (
+    busy_error_data, failed_query_data, lookup_answer, record_answer,
+    save_failed_query, save_query
+)
 from .serializers import (
     QuerySerializer, QueryRequestSerializer, QueryResponseSerializer
 )
+from .tasks import answer_query_task
 from companies.models import Company
-from core.rag_processor import DjangoFinancialRAGProcessor
+from core.llm_limiter import LLMBusyError
+from core.registry import get_async_rag_processor, get_rag_processor
+from core.stats_cache import cached_stats
 
 logger = logging.getLogger(__name__)
 
+# Owner of each queued question, kept as long as Celery keeps results (1 day)
+QUERY_TASK_OWNER_PREFIX = 'query_task:'
+QUERY_TASK_OWNER_TTL = 24 * 60 * 60
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients send `Accept: text/event-stream`; errors before the stream starts are rendered as JSON"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def query_stats(queryset):
+    """Totals, per-category counts and average response time in a single query"""
+    counts = queryset.aggregate(
+        total_queries=Count('id'),
+        successful_queries=Count('id', filter=Q(context_found=True)),
+        # Avg skips queries without a response time
+        avg_time=Avg('response_time_ms'),
+        **{
+            f"category_{category_code}": Count('id', filter=Q(category=category_code))
+            for category_code, _ in Query.CATEGORY_CHOICES
+        }
+    )
+    
+    return {
+        'total_queries': counts['total_queries'],
+        'by_category': {
+            category_code: {
+                'name': category_name,
+                'count': counts[f"category_{category_code}"]
+            }
+            for category_code, category_name in Query.CATEGORY_CHOICES
+        },
+        'avg_response_time': int(counts['avg_time']) if counts['avg_time'] else 0,
+        'successful_queries': counts['successful_queries']
+    }
+
 
 class QueryViewSet(viewsets.ModelViewSet):
     serializer_class = QuerySerializer
     
     def get_queryset(self):
-        return Query.objects.filter(company__created_by=self.request.user)
+        return Query.objects.filter(
+            company__created_by=self.request.user
+        ).select_related('company').prefetch_related('sources')
 
     @action(detail=False, methods=['post'])
     def ask(self, request):
@@ -31,6 +93,7 @@ class QueryViewSet(viewsets.ModelViewSet):
         company_id = serializer.validated_data['company_id']
         question = serializer.validated_data['question']
         category = serializer.validated_data.get('category', 'general')
+        filters = serializer.get_filters()
         
         # Verify user owns the company
         company = get_object_or_404(Company, id=company_id, created_by=request.user)
@@ -38,114 +101,187 @@ class QueryViewSet(viewsets.ModelViewSet):
         start_time = time.time()
         
         try:
-            # Initialize RAG processor
-            processor = DjangoFinancialRAGProcessor()
+            answer_cache, result = lookup_answer(company, question, filters)
+            cache_hit = result is not None
             
-            # Get answer from RAG pipeline
-            result = processor.analyze_company(question, company.name)
-            
-            end_time = time.time()
-            response_time_ms = int((end_time - start_time) * 1000)
+            if not cache_hit:
+                # Get answer from the shared RAG processor
+                result = get_rag_processor().analyze_company(question, company.name, filters=filters)
             
             # Save query and sources to database
-            with transaction.atomic():
-                query = Query.objects.create(
-                    company=company,
-                    user=request.user,
-                    question=question,
-                    answer=result['answer'],
-                    category=category,
-                    sources_count=len(result['sources']),
-                    response_time_ms=response_time_ms,
-                    context_found=result.get('context_found', True)
-                )
-                
-                # Save sources
-                for source_data in result['sources']:
-                    QuerySource.objects.create(
-                        query=query,
-                        source_type=source_data['type'],
-                        source_name=source_data['source'],
-                        content_snippet=source_data['content'],
-                        metadata={
-                            'title': source_data.get('title', ''),
-                            'url': source_data.get('url', ''),
-                            'page': source_data.get('page', ''),
-                            'date': source_data.get('date', ''),
-                            'headers': source_data.get('headers', [])
-                        }
-                    )
-            
-            # Prepare response
-            response_data = {
-                'query_id': query.id,
-                'question': question,
-                'answer': result['answer'],
-                'company': company.name,
-                'sources': result['sources'],
-                'context_found': result.get('context_found', True),
-                'response_time_ms': response_time_ms,
-                'created_at': query.created_at
-            }
-            
-            logger.info(f"Successfully answered query {query.id} for company {company.name}")
+            response_data = record_answer(
+                company, request.user, question, category, result, cache_hit, answer_cache, start_time
+            )
             
             return Response(
                 QueryResponseSerializer(response_data).data,
                 status=status.HTTP_201_CREATED
             )
             
+        except LLMBusyError as e:
+            logger.warning(f"Rejected query for company {company.name}: {e}")
+            return Response(
+                busy_error_data(e),
+                status=e.status_code,
+                headers={'Retry-After': str(e.retry_after)}
+            )
+            
         except Exception as e:
             logger.error(f"Error processing query for company {company.name}: {e}")
             
-            # Still save the failed query for debugging
-            try:
-                with transaction.atomic():
-                    query = Query.objects.create(
-                        company=company,
-                        user=request.user,
-                        question=question,
-                        answer=f"Error processing query: {str(e)}",
-                        category=category,
-                        sources_count=0,
-                        response_time_ms=int((time.time() - start_time) * 1000),
-                        context_found=False
-                    )
-            except:
-                pass
+            save_failed_query(company, request.user, question, category, e, start_time)
             
-            return Response({
-                'error': 'Failed to process query',
-                'message': str(e),
-                'question': question,
-                'company': company.name
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response(failed_query_data(e, question, company), status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=False, methods=['get'])
-    def stats(self, request):
-        """Get query statistics"""
-        queryset = self.get_queryset()
+    @action(detail=False, methods=['post'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def ask_stream(self, request):
+        """
+        Ask a question and stream the answer as server-sent events:
+        `sources` after retrieval, `token` per generated piece, then `done`
+        (or `error`). The query is saved once the stream completes.
+        """
+        serializer = QueryRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         
-        stats = {
-            'total_queries': queryset.count(),
-            'by_category': {},
-            'avg_response_time': 0,
-            'successful_queries': queryset.filter(context_found=True).count()
-        }
+        question = serializer.validated_data['question']
+        category = serializer.validated_data.get('category', 'general')
+        filters = serializer.get_filters()
         
-        # Calculate stats by category
-        for category_code, category_name in Query.CATEGORY_CHOICES:
-            count = queryset.filter(category=category_code).count()
-            stats['by_category'][category_code] = {
-                'name': category_name,
-                'count': count
-            }
+        # Verify user owns the company
+        company = get_object_or_404(Company, id=serializer.validated_data['company_id'], created_by=request.user)
         
-        # Calculate average response time
-        avg_time = queryset.exclude(response_time_ms__isnull=True).aggregate(
-            avg_time=models.Avg('response_time_ms')
-        )['avg_time']
-        stats['avg_response_time'] = int(avg_time) if avg_time else 0
+        def events():
+            start_time = time.time()
+            first_token_time = None
+            
+            try:
+                answer_cache, result = lookup_answer(company, question, filters)
+                cache_hit = result is not None
+                
+                if cache_hit:
+                    yield sse_event('sources', {
+                        'sources': result['sources'],
+                        'company': company.name,
+                        'prompt_tokens': result.get('prompt_tokens')
+                    })
+                    first_token_time = time.time()
+                    yield sse_event('token', {'text': result['answer']})
+                else:
+                    processor = get_rag_processor()
+                    for event, data in processor.analyze_company_stream(question, company.name, filters=filters):
+                        if event == 'sources':
+                            yield sse_event('sources', data)
+                        elif event == 'token':
+                            if first_token_time is None:
+                                first_token_time = time.time()
+                            yield sse_event('token', {'text': data})
+                        elif event == 'done':
+                            result = data
+                    
+                    if not result.get('llm_error'):
+                        answer_cache.set(question, result)
+                
+                response_time_ms = int((time.time() - start_time) * 1000)
+                time_to_first_token_ms = (
+                    int((first_token_time - start_time) * 1000) if first_token_time else None
+                )
+                query = save_query(
+                    company, request.user, question, category, result, response_time_ms, cache_hit,
+                    time_to_first_token_ms=time_to_first_token_ms
+                )
+                
+                logger.info(
+                    f"Streamed answer for query {query.id} for company {company.name} "
+                    f"(first token {time_to_first_token_ms}ms, total {response_time_ms}ms, cache hit: {cache_hit})"
+                )
+                yield sse_event('done', {
+                    'query_id': query.id,
+                    'answer': result['answer'],
+                    'context_found': result.get('context_found', True),
+                    'cache_hit': cache_hit,
+                    'prompt_tokens': result.get('prompt_tokens'),
+                    'response_time_ms': response_time_ms,
+                    'time_to_first_token_ms': time_to_first_token_ms,
+                    'created_at': query.created_at.isoformat()
+                })
+                
+            except LLMBusyError as e:
+                logger.warning(f"Rejected streamed query for company {company.name}: {e}")
+                yield sse_event('error', {
+                    'error': 'LLM busy',
+                    'message': str(e),
+                    'status': e.status_code,
+                    'retry_after': e.retry_after
+                })
+                
+            except Exception as e:
+                logger.error(f"Error streaming query for company {company.name}: {e}")
+                save_failed_query(company, request.user, question, category, e, start_time)
+                yield sse_event('error', {'error': 'Failed to process query', 'message': str(e)})
+        
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def ask_queued(self, request):
+        """
+        Queue a question on the rag_query Celery queue and return its task id
+        right away; poll `tasks/{task_id}/` for the answer
+        """
+        serializer = QueryRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Verify user owns the company
+        company = get_object_or_404(Company, id=serializer.validated_data['company_id'], created_by=request.user)
+
+        task = answer_query_task.delay(
+            company.id,
+            request.user.id,
+            serializer.validated_data['question'],
+            serializer.validated_data.get('category', 'general'),
+            serializer.get_filters()
+        )
+        # Task ids are only visible to the user who queued them
+        cache.set(f"{QUERY_TASK_OWNER_PREFIX}{task.id}", request.user.id, QUERY_TASK_OWNER_TTL)
+
+        return Response({
+            'task_id': task.id,
+            'status_url': reverse('query-task-status', kwargs={'task_id': task.id}, request=request),
+            'message': 'Question queued.'
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'tasks/(?P<task_id>[\w-]+)')
+    def task_status(self, request, task_id=None):
+        """State of a queued question, with the answer once it is ready"""
+        if cache.get(f"{QUERY_TASK_OWNER_PREFIX}{task_id}") != request.user.id:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        task = AsyncResult(task_id)
+        data = {'task_id': task_id, 'state': task.state}
+
+        if task.state == 'PROGRESS':
+            data['progress'] = task.info
+        elif task.state == 'RETRY':
+            data['message'] = 'The model is busy, the question was queued again.'
+        elif task.state == 'FAILURE':
+            data['error'] = 'Failed to process query'
+            data['message'] = str(task.result)
+        elif task.state == 'SUCCESS':
+            result = dict(task.result)
+            if result.pop('status', None) == 'success':
+                data['result'] = result
+            else:
+                data.update(result)
+
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Get query statistics"""
+        stats = cached_stats(request.user.id, 'queries', lambda: query_stats(self.get_queryset()))
         
         return Response(stats)
 
@@ -154,4 +290,79 @@ class QueryViewSet(viewsets.ModelViewSet):
         """Get recent queries"""
         recent_queries = self.get_queryset()[:10]
         serializer = self.get_serializer(recent_queries, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+async def ask_async(request):
+    """
+    Async version of QueryViewSet.ask for ASGI deployments: Qdrant and Ollama
+    are awaited instead of blocking a worker thread, ORM and cache calls go
+    through sync_to_async.
+    """
+    if not isinstance(request, ASGIRequest):
+        # The async clients are cached per event loop; under WSGI every request
+        # runs in a new loop and would leave its connection pools behind
+        return JsonResponse(
+            {'detail': 'ask_async is only served by the ASGI app, use ask instead.'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'detail': 'JSON parse error.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = QueryRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    question = serializer.validated_data['question']
+    category = serializer.validated_data.get('category', 'general')
+    filters = serializer.get_filters()
+    
+    # Verify user owns the company
+    company = await Company.objects.filter(
+        id=serializer.validated_data['company_id'], created_by=user
+    ).afirst()
+    if company is None:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    
+    start_time = time.time()
+    
+    try:
+        answer_cache, result = await sync_to_async(lookup_answer)(company, question, filters)
+        cache_hit = result is not None
+        
+        if not cache_hit:
+            processor = await sync_to_async(get_async_rag_processor)()
+            result = await processor.analyze_company(question, company.name, filters=filters)
+        
+        # Save query and sources to database
+        response_data = await sync_to_async(record_answer)(
+            company, user, question, category, result, cache_hit, answer_cache, start_time
+        )
+        
+        return JsonResponse(
+            QueryResponseSerializer(response_data).data,
+            status=status.HTTP_201_CREATED
+        )
+        
+    except LLMBusyError as e:
+        logger.warning(f"Rejected async query for company {company.name}: {e}")
+        response = JsonResponse(busy_error_data(e), status=e.status_code)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error processing async query for company {company.name}: {e}")
+        
+        await sync_to_async(save_failed_query)(company, user, question, category, e, start_time)
+        
+        return JsonResponse(failed_query_data(e, question, company), status=status.HTTP_500_INTERNAL_SERVER_ERROR)